@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+import structlog
+from bson.errors import InvalidDocument
+from pymongo.errors import BulkWriteError
+
+from core.db import db
+
+
+log = structlog.get_logger(__name__)
+
+
+class AccessLogWriter:
+    """
+    Buffer dos access_logs do redirect: o handler só faz put (sem esperar
+    o Mongo) e uma task em background grava em lotes com insert_many,
+    a cada max_batch documentos ou max_delay segundos, o que vier antes.
+    Com a fila cheia o registro é descartado em vez de segurar o redirect.
+    Falhas transitórias são retentadas com backoff (como na LogQueue) e, se
+    o consumidor morrer mesmo assim, ele é logado e reiniciado.
+    Cada put aceito recebe um número de sequência: flush espera só até o
+    que foi enfileirado antes dele, nunca pela fila inteira.
+    """
+
+    def __init__(
+        self,
+        collection,
+        max_batch: int = 500,
+        max_delay: float = 0.05,
+        maxsize: int = 50_000,
+        max_retries: int = 3,
+    ) -> None:
+        self.collection = collection
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self.dropped = 0
+        self._queue: asyncio.Queue[Dict[str, Any]] = asyncio.Queue(maxsize=maxsize)
+        self._task: Optional[asyncio.Task] = None
+        # registros aceitos / já processados (gravados ou descartados com log)
+        self._enqueued = 0
+        self._processed = 0
+        self._waiters: List[Tuple[int, asyncio.Future]] = []
+
+    def put(self, doc: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(doc)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return
+        self._enqueued += 1
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._drain())
+            self._task.add_done_callback(self._on_done)
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        if task is not self._task or task.cancelled():
+            return
+        log.error("access-log-writer-died", error=repr(task.exception()))
+        self._task = None
+        self.start()
+
+    async def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Espera os registros enfileirados até agora serem gravados (até
+        timeout). Puts feitos durante a espera não a prolongam, então o
+        tempo não depende do tráfego de redirects. False se estourar.
+        """
+        target = self._enqueued
+        if self._processed >= target:
+            return True
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append((target, waiter))
+        try:
+            await asyncio.wait_for(waiter, timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            log.warning(
+                "access-log-writer-flush-timeout",
+                pending=target - self._processed,
+            )
+            return False
+        finally:
+            self._waiters = [(t, w) for t, w in self._waiters if w is not waiter]
+
+    def _mark_processed(self, count: int) -> None:
+        self._processed += count
+        waiting: List[Tuple[int, asyncio.Future]] = []
+        for target, waiter in self._waiters:
+            if waiter.done():
+                continue
+            if target <= self._processed:
+                waiter.set_result(None)
+            else:
+                waiting.append((target, waiter))
+        self._waiters = waiting
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Grava o que estiver na fila (até timeout) e encerra o consumidor."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            log.warning("access-log-writer-stop-timeout", pending=self._queue.qsize())
+        task, self._task = self._task, None
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        if self.dropped:
+            log.warning("access-log-writer-dropped", dropped=self.dropped)
+
+    async def _next_batch(self) -> List[Dict[str, Any]]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _drain(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._write(batch)
+            except Exception as e:
+                log.error("access-log-insert-failed", count=len(batch), error=str(e))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+                self._mark_processed(len(batch))
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> None:
+        delay = 0.5
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                await self.collection.insert_many(batch, ordered=False)
+                return
+            except BulkWriteError as e:
+                # ordered=False: os documentos válidos já foram gravados; os
+                # erros são por documento (ex.: _id duplicado de um retry)
+                log.warning(
+                    "access-log-insert-partial",
+                    count=len(batch),
+                    errors=len(e.details.get("writeErrors", [])),
+                )
+                return
+            except InvalidDocument:
+                # um documento inválido derruba o lote inteiro no cliente;
+                # grava um a um para perder só o registro ruim
+                await self._write_each(batch)
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    log.error("access-log-insert-failed", count=len(batch), error=str(e))
+                    return
+                await asyncio.sleep(delay)
+                delay *= 2
+
+    async def _write_each(self, batch: List[Dict[str, Any]]) -> None:
+        for doc in batch:
+            try:
+                await self.collection.insert_one(doc)
+            except Exception as e:
+                log.error("access-log-insert-failed", count=1, error=str(e))
+
+
+access_log_writer = AccessLogWriter(db.access_logs)
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+import structlog
+
+
+log = structlog.get_logger(__name__)
+
+
+class LogQueue:
+    """
+    Fila limitada de registros para o LogCenter, drenada por uma única task
+    em background. Quem loga só faz put_nowait; se a fila estiver cheia o
+    registro é descartado em vez de segurar a requisição.
+    """
+
+    def __init__(self, sender, maxsize: int = 10_000, max_retries: int = 3) -> None:
+        self.sender = sender
+        self.max_retries = max_retries
+        self.dropped = 0
+        self._queue: asyncio.Queue[Dict[str, Any]] = asyncio.Queue(maxsize=maxsize)
+        self._task: Optional[asyncio.Task] = None
+
+    def put(self, **record: Any) -> None:
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._drain())
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Espera a fila esvaziar (até timeout) e encerra o consumidor."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            log.warning("log-queue-stop-timeout", pending=self._queue.qsize())
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self.dropped:
+            log.warning("log-queue-dropped", dropped=self.dropped)
+
+    async def _drain(self) -> None:
+        while True:
+            record = await self._queue.get()
+            try:
+                await self._send(record)
+            finally:
+                self._queue.task_done()
+
+    async def _send(self, record: Dict[str, Any]) -> None:
+        delay = 0.5
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                await self.sender.send(**record)
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    log.warning("log-send-failed", error=str(e))
+                    return
+                await asyncio.sleep(delay)
+                delay *= 2
+
+
+class AuditMiddleware:
+    """
+    Middleware ASGI puro de auditoria: registra método, rota, status e
+    duração de cada requisição HTTP no LogCenter.
+    Não usa BaseHTTPMiddleware (sem task extra nem re-stream do body) e
+    o registro vai para a LogQueue, fora do caminho da resposta.
+    """
+
+    def __init__(self, app, queue: LogQueue) -> None:
+        self.app = app
+        self.queue = queue
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self._dispatch(scope, status_code, time.perf_counter() - start)
+
+    def _dispatch(self, scope, status_code: int, elapsed: float) -> None:
+        client = scope.get("client")
+        data: Dict[str, Any] = {
+            "method": scope.get("method"),
+            "path": scope.get("path"),
+            "status_code": status_code,
+            "duration_ms": round(elapsed * 1000, 2),
+            "client_ip": client[0] if client else None,
+        }
+        self.queue.put(
+            level="INFO" if status_code < 500 else "ERROR",
+            message=f"{data['method']} {data['path']}",
+            status="OK" if status_code < 400 else "ERROR",
+            tags=["audit"],
+            data=data,
+        )
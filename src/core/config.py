@@ -1,3 +1,4 @@
+from functools import lru_cache
 from pydantic import Field
 from pydantic_settings import BaseSettings
 from typing import Optional
@@ -15,17 +16,30 @@ class Settings(BaseSettings):
     LOG_PROJECT_ID: Optional[str] = Field(default=None, env="LOG_PROJECT_ID")
 
     SENTRY_DSN: Optional[str] = Field(default=None, env="SENTRY_DSN")
+    PROFILING: bool = Field(default=False, env="PROFILING")
+    TEMPLATE_HOT_RELOAD: bool = Field(default=False, env="TEMPLATE_HOT_RELOAD")
 
     MONGO_URI: str = Field(..., env="MONGO_URI")
     MONGO_DB: str = Field("intel", env="MONGO_DB")
+    MONGO_MAX_POOL_SIZE: int = Field(100, env="MONGO_MAX_POOL_SIZE")
+    MONGO_MIN_POOL_SIZE: int = Field(10, env="MONGO_MIN_POOL_SIZE")
+    MONGO_COMPRESSORS: str = Field("zstd,zlib", env="MONGO_COMPRESSORS")
 
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(60 * 24 * 8, env="ACCESS_TOKEN_EXPIRE_MINUTES")
     JWT_SECRET: str = Field(..., env="JWT_SECRET")
     JWT_ALGORITHM: str = Field("HS256", env="JWT_ALGORITHM")
+    ADMIN_CREATION_TOKEN: Optional[str] = Field(default=None, env="ADMIN_CREATION_TOKEN")
 
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
         extra = "ignore"
 
-settings = Settings()
\ No newline at end of file
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Lê o .env e valida os campos uma única vez por processo."""
+    return Settings()
+
+
+settings = get_settings()
@@ -1,14 +1,71 @@
+from functools import lru_cache
+
 from motor.motor_asyncio import AsyncIOMotorClient
 import certifi
 from core.config import settings
 
-_client = AsyncIOMotorClient(
-    settings.MONGO_URI,
-    tls=True,
-    tlsCAFile=certifi.where(),
-    serverSelectionTimeoutMS=20000,
-)
-db = _client[settings.MONGO_DB]
+
+@lru_cache(maxsize=1)
+def get_client() -> AsyncIOMotorClient:
+    """
+    Client Motor único por processo. A conexão em si só acontece na
+    primeira operação; aqui só ficam pool e compressão configurados.
+    """
+    return AsyncIOMotorClient(
+        settings.MONGO_URI,
+        tls=True,
+        tlsCAFile=certifi.where(),
+        serverSelectionTimeoutMS=20000,
+        maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+        minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+        compressors=settings.MONGO_COMPRESSORS,
+    )
+
+
+db = get_client()[settings.MONGO_DB]
+
+
+async def ensure_slug_index() -> None:
+    """
+    Índice único de slug: é ele que garante que o shorten_link não grave
+    slugs duplicados, então falhar aqui deve impedir o startup.
+    O filtro parcial deixa de fora documentos legados sem slug (ou com
+    slug vazio/nulo), que de outra forma bloqueariam a criação do índice.
+    """
+    indexes = await db.links.index_information()
+    if any(
+        spec.get("key") == [("slug", 1)] and spec.get("unique")
+        for spec in indexes.values()
+    ):
+        return
+    await db.links.create_index(
+        "slug",
+        unique=True,
+        partialFilterExpression={"slug": {"$gt": ""}},
+    )
+
 
 async def init_db():
     await db.registrations.create_index("createdAt")
+
+    # filtro por título do painel admin (regex ancorada usa o índice);
+    # URLs são buscadas por substring, que não aproveita índice
+    await db.links.create_index("title_lc")
+
+    # listagem/export ordenam por created_at desc: igualdade antes do sort
+    # para o Mongo percorrer o índice já ordenado (sem estágio SORT)
+    await db.links.create_index([("created_at", -1)])
+    await db.links.create_index([("is_active", 1), ("created_at", -1)])
+    await db.links.create_index([("tags", 1), ("created_at", -1)])
+    await db.links.create_index([("slug", 1), ("created_at", -1)])
+
+    # logs por link: find({"slug"}).sort("ts", -1).limit(n) vira um IXSCAN
+    # de no máximo n chaves; com ip no fim, o $group por ip das métricas do
+    # dashboard é coberto pelo índice
+    await db.access_logs.create_index([("slug", 1), ("ts", -1), ("ip", 1)])
+    # janelas do dashboard sem slug (overview, access-logs) filtram só por ts
+    await db.access_logs.create_index([("ts", -1)])
+
+
+def close_db() -> None:
+    get_client().close()
@@ -0,0 +1,13 @@
+import httpx
+
+
+# client HTTP compartilhado (callbacks e geo por IP): mantém conexões
+# keep-alive entre requisições em vez de um handshake TCP+TLS por chamada.
+# Timeouts são passados em cada chamada.
+http_client = httpx.AsyncClient(
+    limits=httpx.Limits(max_connections=200, max_keepalive_connections=100),
+)
+
+
+async def close_http_client() -> None:
+    await http_client.aclose()
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from urllib.parse import parse_qs
+
+from fastapi.responses import HTMLResponse
+
+try:
+    from pyinstrument import Profiler
+    PYINSTRUMENT_AVAILABLE = True
+except Exception:
+    PYINSTRUMENT_AVAILABLE = False
+
+
+class ProfilerMiddleware:
+    """
+    Middleware ASGI de profiling: requisições com ?profile=1 rodam sob o
+    pyinstrument e a resposta é substituída pelo relatório HTML.
+    As demais requisições passam direto, sem custo de amostragem.
+    """
+
+    def __init__(self, app, interval: float = 0.001) -> None:
+        self.app = app
+        self.interval = interval
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        async def discard(message) -> None:
+            pass
+
+        profiler = Profiler(interval=self.interval, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profiler.stop()
+
+        await HTMLResponse(profiler.output_html())(scope, receive, send)
+
+    @staticmethod
+    def _wants_profile(scope) -> bool:
+        qs = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        return qs.get("profile", [""])[0] == "1"
@@ -0,0 +1,76 @@
+import hashlib
+import re
+import time
+from typing import Any, Dict
+
+import jwt
+from cachetools import TLRUCache
+from fastapi import HTTPException, Security
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from core.config import settings
+
+
+JWT_CACHE_TTL = 60.0
+
+# invariantes da verificação resolvidas uma vez no import
+_JWT_KEY = settings.JWT_SECRET
+_JWT_ALGORITHMS = [settings.JWT_ALGORITHM]
+_JWT_SHAPE = re.compile(r"^[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+$")
+_jwt = jwt.PyJWT()
+
+
+def _jwt_ttu(_key: bytes, payload: Dict[str, Any], now: float) -> float:
+    """Entrada expira em 60s ou no exp do token, o que vier primeiro."""
+    exp = payload.get("exp")
+    if exp is None:
+        return now + JWT_CACHE_TTL
+    return min(now + JWT_CACHE_TTL, float(exp))
+
+
+# payloads de JWT já validados, chaveados pelo hash do token
+_jwt_cache: "TLRUCache[bytes, Dict[str, Any]]" = TLRUCache(
+    maxsize=10_000,
+    ttu=_jwt_ttu,
+    timer=time.time,
+)
+
+
+def decode_jwt(token: str) -> Dict[str, Any]:
+    """
+    jwt.decode com cache: o mesmo token reaproveitado em várias requisições
+    só passa pela verificação HMAC uma vez a cada 60s (ou até o exp).
+    Propaga jwt.PyJWTError quando o token é inválido; erros não são cacheados.
+    """
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    payload = _jwt_cache.get(key)
+    if payload is not None:
+        return payload
+
+    # rejeita lixo antes de decodificar base64 e calcular HMAC
+    if not _JWT_SHAPE.match(token):
+        raise jwt.DecodeError("Token malformado")
+
+    payload = _jwt.decode(token, _JWT_KEY, algorithms=_JWT_ALGORITHMS)
+    _jwt_cache[key] = payload
+    return payload
+
+
+# um único HTTPBearer para todos os routers protegidos
+bearer = HTTPBearer(auto_error=False)
+
+
+async def admin_required(
+    credentials: HTTPAuthorizationCredentials = Security(bearer),
+) -> Dict[str, Any]:
+    """Dependência das rotas admin/dash: valida o bearer JWT (com cache)."""
+    if not credentials or not credentials.credentials:
+        raise HTTPException(status_code=401, detail="Credenciais ausentes")
+
+    try:
+        payload = decode_jwt(credentials.credentials)
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=401, detail="Token inválido")
+
+    return payload
@@ -0,0 +1,43 @@
+from typing import Dict
+
+from jinja2 import FileSystemBytecodeCache
+from fastapi.responses import HTMLResponse
+from fastapi.templating import Jinja2Templates
+
+from core.config import settings
+
+
+TEMPLATES_DIR = "src/static/templates"
+
+# instância única para todas as rotas: sem checagem de mtime a cada render
+# e com o bytecode compilado persistido entre workers/reinícios
+# (TEMPLATE_HOT_RELOAD=true em dev volta a renderizar a cada request)
+templates = Jinja2Templates(directory=TEMPLATES_DIR)
+templates.env.auto_reload = settings.TEMPLATE_HOT_RELOAD
+if not settings.TEMPLATE_HOT_RELOAD:
+    templates.env.bytecode_cache = FileSystemBytecodeCache()
+
+
+# páginas do painel não dependem de contexto: HTML renderizado uma vez
+_rendered: Dict[str, bytes] = {}
+
+
+def render_page(name: str) -> bytes:
+    if settings.TEMPLATE_HOT_RELOAD:
+        return templates.get_template(name).render().encode()
+
+    body = _rendered.get(name)
+    if body is None:
+        body = _rendered[name] = templates.get_template(name).render().encode()
+    return body
+
+
+def page_response(name: str) -> HTMLResponse:
+    headers = None if settings.TEMPLATE_HOT_RELOAD else {"Cache-Control": "public, max-age=60"}
+    return HTMLResponse(content=render_page(name), headers=headers)
+
+
+def warm_templates() -> None:
+    """Compila e renderiza todos os templates de uma vez (chamado no startup)."""
+    for name in templates.env.list_templates(extensions=["html"]):
+        render_page(name)
@@ -0,0 +1,13 @@
+# versão dos dados de links neste processo: rotas que criam, editam ou
+# excluem links incrementam; caches derivados (ex.: /dash/overview) usam
+# o valor na chave e deixam de servir respostas anteriores à mudança
+_links_version = 0
+
+
+def links_version() -> int:
+    return _links_version
+
+
+def bump_links_version() -> None:
+    global _links_version
+    _links_version += 1
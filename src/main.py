@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import asyncio
 import logging
 import os
 from contextlib import asynccontextmanager
@@ -9,17 +8,26 @@ from pathlib import Path
 import structlog
 from logcenter_sdk.config import LogCenterConfig
 from logcenter_sdk.sender import LogCenterSender
-from logcenter_sdk.middleware import LogCenterAuditMiddleware
+from pymongo.errors import OperationFailure
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 
+from core.access_logs import access_log_writer
+from core.audit import AuditMiddleware, LogQueue
 from core.config import settings
+from core.db import close_db, ensure_slug_index, init_db
+from core.http import close_http_client
+from core.profiling import PYINSTRUMENT_AVAILABLE, ProfilerMiddleware
+from core.templates import warm_templates
 from routes.auth import router as auth_router
 from routes.admin import router as admin_router
 from routes.dash import router as dash_router
 from routes.redirect import router as redirect_router
+from utils.qr import shutdown_qr_pool
 
 
 logging.basicConfig(level=logging.INFO, format="%(message)s")
@@ -56,29 +64,51 @@ try:
 except Exception:
     SENTRY_AVAILABLE = False
 
+log_queue = LogQueue(sender)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     app.state.log_sender = sender
+    app.state.log_queue = log_queue
 
     # === STARTUP ===
-    async def _delayed_startup_log():
-        await asyncio.sleep(0.3)
-        await sender.send(
-            level="INFO",
-            message="Link Shortener API - App startup",
-            status="OK",
-            tags=["startup"],
-            data={"env": settings.APP_ENV, "version": "0.1-dev"},
-            spool_on_fail=False,
-        )
+    # sem o índice único de slug o shorten_link aceitaria duplicados
+    try:
+        await ensure_slug_index()
+    except OperationFailure as e:
+        if e.code == 11000:
+            log.error(
+                "slug-index-duplicates",
+                error=str(e),
+                hint="rode PYTHONPATH=src python -m scripts.links_dedupe_slugs e reinicie",
+            )
+        raise
+
+    log_queue.start()
+    access_log_writer.start()
 
-    asyncio.create_task(_delayed_startup_log())
+    try:
+        await init_db()
+    except Exception as e:
+        log.warning("init-db-failed", error=str(e))
+
+    warm_templates()
+
+    log_queue.put(
+        level="INFO",
+        message="Link Shortener API - App startup",
+        status="OK",
+        tags=["startup"],
+        data={"env": settings.APP_ENV, "version": "0.1-dev"},
+        spool_on_fail=False,
+    )
 
     yield
 
     # === SHUTDOWN ===
     try:
-        await sender.send(
+        log_queue.put(
             level="INFO",
             message="Link Shortener API - App shutdown",
             status="OK",
@@ -86,8 +116,13 @@ async def lifespan(app: FastAPI):
             data={"env": settings.APP_ENV, "version": "0.1-dev"},
             spool_on_fail=False
         )
+        await access_log_writer.stop()
+        await log_queue.stop()
     finally:
         await sender.stop_background_flush()
+        await close_http_client()
+        shutdown_qr_pool()
+        close_db()
 
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -95,7 +130,12 @@ STATIC_DIR = os.path.join(BASE_DIR, "static")
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title=settings.APP_NAME, version="0.1-dev", lifespan=lifespan)
+    app = FastAPI(
+        title=settings.APP_NAME,
+        version="0.1-dev",
+        lifespan=lifespan,
+        default_response_class=ORJSONResponse,
+    )
 
     app.add_middleware(
         CORSMiddleware,
@@ -104,12 +144,17 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
-    app.add_middleware(LogCenterAuditMiddleware, sender=sender)
+    app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+    app.add_middleware(AuditMiddleware, queue=log_queue)
 
     if settings.SENTRY_DSN and SENTRY_AVAILABLE:
         sentry_sdk.init(dsn=settings.SENTRY_DSN, traces_sample_rate=0.2)
         app.add_middleware(SentryAsgiMiddleware)
 
+    if settings.PROFILING and PYINSTRUMENT_AVAILABLE:
+        app.add_middleware(ProfilerMiddleware)
+
     app.mount("/src/static", StaticFiles(directory="src/static"), name="src-static")
 
     app.include_router(redirect_router)
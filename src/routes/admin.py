@@ -1,74 +1,372 @@
-import jwt
+import asyncio
 import structlog
 import shortuuid
 import csv
 import io
+import json
 import os
+import re
 
-from typing import List, Optional, Any, Dict
+from typing import List, Optional, Any, Dict, Set, Tuple
 from bson import ObjectId
+from cachetools import TTLCache
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, PyMongoError
 from datetime import datetime, timezone, date, time
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Path, status, Security, Request, Form, Body
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Path, status, Form, Body
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse, HTMLResponse
-from fastapi.templating import Jinja2Templates
 
+from core.access_logs import access_log_writer
 from core.config import settings
 from core.db import db
-from schemas.shortlink import ShortenResponse
-from utils.qr import generate_qr
-from schemas.admin import RegenerateQrRequest, RegenerateQrResponse, RegenerateQrResult
+from core.templates import page_response
+from core.versions import bump_links_version
+from core.security import admin_required
+from utils.filters import contains_regex, prefix_regex
+from utils.qr import STATIC_PATH, generate_qr, get_qr_pool
+from schemas.admin import RegenerateQrRequest, RegenerateQrResponse
 from schemas.shortlink import ShortenResponse
 
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 log = structlog.get_logger()
-bearer = HTTPBearer(auto_error=False)
-templates = Jinja2Templates(directory="src/static/templates")
+
+BASE_URL = settings.BASE_URL.rstrip("/")
+QR_PNG_URL = BASE_URL + "/src/static/qrs/{slug}.png"
+QR_SVG_URL = BASE_URL + "/src/static/qrs/{slug}.svg"
+
+EXPORT_COLUMNS = [
+    "id",
+    "slug",
+    "original_url",
+    "title",
+    "notes",
+    "tags",
+    "is_active",
+    "created_at",
+    "updated_at",
+    "expires_at",
+    "max_clicks",
+    "click_count",
+    "callback_url",
+]
+EXPORT_PROJECTION = {c: 1 for c in EXPORT_COLUMNS if c != "id"}
+
+LINK_FIELDS = [
+    "slug",
+    "original_url",
+    "title",
+    "notes",
+    "tags",
+    "is_active",
+    "callback_url",
+    "status",
+    "created_at",
+    "updated_at",
+    "expires_at",
+    "max_clicks",
+    "click_count",
+    "qr_png",
+    "qr_svg",
+]
+LINK_PROJECTION = {f: 1 for f in LINK_FIELDS}
+LINK_PROJECTION_NO_QR = {f: 1 for f in LINK_FIELDS if f not in ("qr_png", "qr_svg")}
+EXPORT_BATCH_SIZE = 1000
+
+_CSV_SPECIAL = re.compile(r'[,"\r\n]')
+_OID_RE = re.compile(r"[0-9a-fA-F]{24}\Z")
+
+ACCESS_LOG_COLUMNS = [
+    "_id",
+    "slug",
+    "timestamp",
+    "ip",
+    "user_agent",
+    "referer",
+    "accept_language",
+    "dnt",
+    "connection",
+    "encoding",
+    "destination_url",
+    "is_mobile",
+    "is_tablet",
+    "is_pc",
+    "browser",
+    "browser_version",
+    "os",
+    "os_version",
+    "device",
+    "country",
+    "country_code",
+    "region",
+    "city",
+    "latitude",
+    "longitude",
+    "timezone",
+]
+ACCESS_LOG_PROJECTION = {c: 1 for c in ACCESS_LOG_COLUMNS} | {"ts": 1}
+# normalização feita no servidor: _id como string e timestamp ISO a partir
+# de ts (BSON date) quando houver, senão o timestamp já gravado
+ACCESS_LOG_OUTPUT = ACCESS_LOG_PROJECTION | {
+    "_id": {"$toString": "$_id"},
+    "timestamp": {
+        "$cond": [
+            {"$eq": [{"$type": "$ts"}, "date"]},
+            {"$dateToString": {"date": "$ts", "format": "%Y-%m-%dT%H:%M:%S.%LZ"}},
+            "$timestamp",
+        ]
+    },
+}
+ACCESS_LOG_BATCH_SIZE = 500
+
+COUNT_LIMIT = 10_000
+SLUG_ATTEMPTS = 3
+# espera pelo buffer de access_logs no delete: curta na requisição, longa
+# na segunda chance em background
+DELETE_FLUSH_TIMEOUT = 1.0
+LATE_FLUSH_TIMEOUT = 30.0
+
+_count_cache: "TTLCache[str, int]" = TTLCache(maxsize=256, ttl=30)
+
+# jobs de regeneração em segundo plano (em memória, por processo)
+_regen_jobs: "TTLCache[str, Dict[str, Any]]" = TTLCache(maxsize=1024, ttl=3600)
+_regen_tasks: Set["asyncio.Task[None]"] = set()
+
+
+def _link_out(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Documento de link -> resposta da API (id + LINK_FIELDS, na mesma ordem)."""
+    out = {"id": str(doc["_id"])}
+    out.update({f: doc.get(f) for f in LINK_FIELDS})
+    out["tags"] = out["tags"] or []
+    out["is_active"] = bool(out["is_active"])
+    out["click_count"] = doc.get("click_count", 0)
+    return out
+
+
+def _csv_text(value: Any) -> str:
+    """Campo de texto com a mesma citação mínima do csv.writer (QUOTE_MINIMAL)."""
+    if value is None:
+        return ""
+    text = value if isinstance(value, str) else str(value)
+    if _CSV_SPECIAL.search(text):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def _export_line(doc: Dict[str, Any]) -> str:
+    """
+    Linha do export de links formatada direto (schema fixo): só os campos
+    de texto livre passam pela citação; id, datas e números não precisam.
+    """
+    created_at = doc.get("created_at")
+    updated_at = doc.get("updated_at")
+    expires_at = doc.get("expires_at")
+    is_active = doc.get("is_active")
+    max_clicks = doc.get("max_clicks")
+    return ",".join((
+        str(doc["_id"]),
+        _csv_text(doc.get("slug")),
+        _csv_text(doc.get("original_url")),
+        _csv_text(doc.get("title")),
+        _csv_text(doc.get("notes")),
+        _csv_text("|".join(doc.get("tags") or [])),
+        "" if is_active is None else str(is_active),
+        created_at.isoformat() if created_at else "",
+        updated_at.isoformat() if updated_at else "",
+        expires_at.isoformat() if expires_at else "",
+        "" if max_clicks is None else str(max_clicks),
+        str(doc.get("click_count", 0)),
+        _csv_text(doc.get("callback_url")),
+    )) + "\r\n"
+
+
+def _encode_csv_rows(rows: List[List[Any]]) -> str:
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    return buf.getvalue()
+
+
+def _encode_export_batch(docs: List[Dict[str, Any]]) -> str:
+    return "".join([_export_line(doc) for doc in docs])
+
+
+def _link_filters(
+    slug: Optional[str] = None,
+    title: Optional[str] = None,
+    original_url: Optional[str] = None,
+    callback_url: Optional[str] = None,
+    notes: Optional[str] = None,
+    tag: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> Dict[str, Any]:
+    """
+    Filtro Mongo da listagem/exportação de links. slug e título usam prefixo
+    ancorado (índice); URLs e notas, busca por substring (ex.: "example.com").
+    """
+    filters: Dict[str, Any] = {}
+
+    try:
+        if slug:
+            filters["slug"] = prefix_regex(slug, ignore_case=False)
+        if title:
+            # title_lc (minúsculo) permite prefixo case-sensitive: IXSCAN com
+            # limites restritos em vez de varrer o índice inteiro com /i
+            filters["title_lc"] = prefix_regex(title.lower(), ignore_case=False)
+        if original_url:
+            filters["original_url"] = contains_regex(original_url)
+        if callback_url:
+            filters["callback_url"] = contains_regex(callback_url)
+        if notes:
+            filters["notes"] = contains_regex(notes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if tag:
+        filters["tags"] = tag
+    if is_active is not None:
+        filters["is_active"] = is_active
+
+    if date_from or date_to:
+        dt_filter: Dict[str, Any] = {}
+        if date_from:
+            dt_filter["$gte"] = datetime.combine(date_from, time.min).replace(tzinfo=timezone.utc)
+        if date_to:
+            dt_filter["$lte"] = datetime.combine(date_to, time.max).replace(tzinfo=timezone.utc)
+        filters["created_at"] = dt_filter
+
+    return filters
+
+
+def _count_key(filters: Dict[str, Any]) -> str:
+    return json.dumps(filters, sort_keys=True, default=str)
+
+
+async def _count_links(filters: Dict[str, Any]) -> int:
+    """
+    Total de links para os filtros. Com filtros a contagem para em
+    COUNT_LIMIT e fica em cache por até 30s (a paginação do painel repete o
+    mesmo filtro a cada página); sem filtros o metadado da coleção já é
+    barato e vai direto, sem cache.
+    """
+    if not filters:
+        return await db.links.estimated_document_count()
+    key = _count_key(filters)
+    total = _count_cache.get(key)
+    if total is None:
+        total = await db.links.count_documents(filters, limit=COUNT_LIMIT)
+        _count_cache[key] = total
+    return total
+
+
+def _links_changed() -> None:
+    """Chamado após criar/editar/excluir link: invalida totais e overview em cache."""
+    _count_cache.clear()
+    bump_links_version()
+
+
+def _regen_result(
+    slug: str,
+    ok: bool,
+    reason: Optional[str] = None,
+    qr_png: Optional[str] = None,
+    qr_svg: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Item de RegenerateQrResponse.results como dict (sem validação Pydantic)."""
+    return {"slug": slug, "ok": ok, "reason": reason, "qr_png": qr_png, "qr_svg": qr_svg}
+
+
+def _encode_access_log_batch(docs: List[Dict[str, Any]]) -> str:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=ACCESS_LOG_COLUMNS, restval="", extrasaction="ignore")
+    writer.writerows(docs)
+    return buf.getvalue()
+
+
+def _existing_qr_files() -> Set[str]:
+    try:
+        with os.scandir(STATIC_PATH) as it:
+            return {entry.name for entry in it}
+    except FileNotFoundError:
+        return set()
+
+
+def _remove_qr_files(slug: str) -> None:
+    for ext in ["png", "svg"]:
+        path = STATIC_PATH / f"{slug}.{ext}"
+        try:
+            os.remove(path)
+            log.info("qr-code-deleted", path=str(path))
+        except FileNotFoundError:
+            pass
+
+
+async def _rename_access_logs(slug: str, new_slug: str, until: Optional[datetime] = None) -> int:
+    """
+    Versiona o slug dos logs de um link excluído. Com `until`, só toca logs
+    com ts até ele: um link novo que reaproveite o slug não perde os seus.
+    """
+    filters: Dict[str, Any] = {"slug": slug}
+    if until is not None:
+        filters["ts"] = {"$lte": until}
+    res = await db.access_logs.update_many(filters, {"$set": {"slug": new_slug}})
+    return res.modified_count
+
+
+async def _rename_late_access_logs(slug: str, new_slug: str, until: datetime) -> None:
+    """
+    Segunda chance, depois da resposta, para os logs que ainda estavam no
+    buffer quando o flush do delete_link estourou o tempo.
+    """
+    if not await access_log_writer.flush(timeout=LATE_FLUSH_TIMEOUT):
+        log.error("access-logs-rename-incomplete", slug=slug, new_slug=new_slug)
+    try:
+        modified = await _rename_access_logs(slug, new_slug, until)
+    except PyMongoError as e:
+        log.error("access-logs-rename-failed", slug=slug, new_slug=new_slug, error=str(e))
+        return
+    log.info("access-logs-renamed-late", slug=slug, new_slug=new_slug, logs_renamed=modified)
+
+
+def _oid(link_id: str) -> ObjectId:
+    """Converte o id da rota para ObjectId (400 se inválido)."""
+    # checagem prévia com regex compilada: sem exceção no caminho do 400
+    if not _OID_RE.match(link_id):
+        raise HTTPException(status_code=400, detail="ID inválido")
+    return ObjectId(link_id)
 
 
 @router.get("/", response_class=HTMLResponse)
-async def index(request: Request):
-    return templates.TemplateResponse("admin.html", {"request": request})
+async def index():
+    return page_response("admin.html")
 
 @router.get("/dashboard", response_class=HTMLResponse)
-async def dashboard(request: Request):
-    return templates.TemplateResponse("dashboard.html", {"request": request})
+async def dashboard():
+    return page_response("dashboard.html")
 
 @router.get("/dash/links", response_class=HTMLResponse)
-async def dash_links_page(request: Request):
-    return templates.TemplateResponse("dashboard_links.html", {"request": request})
+async def dash_links_page():
+    return page_response("dashboard_links.html")
 
 @router.get("/dash/link/{slug}", response_class=HTMLResponse)
-async def dash_link_details_page(request: Request, slug: str):
-    return templates.TemplateResponse("dashboard_link_stats.html", {"request": request})
+async def dash_link_details_page(slug: str):
+    return page_response("dashboard_link_stats.html")
 
 @router.get("/dash/logs", response_class=HTMLResponse)
-async def dash_logs_page(request: Request):
-    return templates.TemplateResponse("dashboard_logs.html", {"request": request})
+async def dash_logs_page():
+    return page_response("dashboard_logs.html")
 
 @router.get("/form", response_class=HTMLResponse)
-async def index(request: Request):
-    return templates.TemplateResponse("form.html", {"request": request})
+async def form():
+    return page_response("form.html")
 
-# Admin auth
-async def admin_required(
-    credentials: HTTPAuthorizationCredentials = Security(bearer)
-):
-    if not credentials or not credentials.credentials:
-        raise HTTPException(401, "Credenciais ausentes")
-    try:
-        payload = jwt.decode(
-            credentials.credentials,
-            settings.JWT_SECRET,
-            algorithms=[settings.JWT_ALGORITHM],
-        )
-    except jwt.PyJWTError:
-        raise HTTPException(401, "Token inválido")
-    return payload
-
-@router.post("/shorten",dependencies=[Depends(admin_required)],response_model=ShortenResponse)
+@router.post(
+    "/shorten",
+    dependencies=[Depends(admin_required)],
+    responses={200: {"model": ShortenResponse}},
+)
 async def shorten_link(
     name: str = Form(...),
     url: str = Form(...),
@@ -81,21 +379,12 @@ async def shorten_link(
     Endpoint de form do admin: cria um link,
     e gera QR (mantendo o retorno ShortenResponse).
     """
-    slug = slug or shortuuid.uuid()[:6]
-    if await db.links.find_one({"slug": slug}):
-        raise HTTPException(status_code=409, detail="Slug já está em uso.")
-
-    qr_png_path, qr_svg_path = generate_qr(slug)
-    base_url = settings.BASE_URL.rstrip("/")
-    qr_png = f"{base_url}/{qr_png_path}"
-    qr_svg = f"{base_url}/{qr_svg_path}"
-
     now = datetime.now(timezone.utc)
 
     doc = {
-        "slug": slug,
         "original_url": url,
         "title": name,
+        "title_lc": name.lower(),
         "notes": notes,
         "tags": [],
         "is_active": True,
@@ -105,15 +394,38 @@ async def shorten_link(
         "max_clicks": None,
         "click_count": 0,
         "callback_url": callback_url,
-        "qr_png": qr_png,
-        "qr_svg": qr_svg,
         "status": "valid",
     }
 
-    await db.links.insert_one(doc)
+    # unicidade garantida pelo índice único de slug (sem find_one prévio);
+    # slug gerado tenta de novo em caso de colisão
+    for attempt in range(SLUG_ATTEMPTS):
+        new_slug = slug or shortuuid.uuid()[:6]
+        doc.pop("_id", None)
+        doc.update(
+            slug=new_slug,
+            qr_png=QR_PNG_URL.format(slug=new_slug),
+            qr_svg=QR_SVG_URL.format(slug=new_slug),
+        )
+        try:
+            await db.links.insert_one(doc)
+            break
+        except DuplicateKeyError:
+            if slug or attempt == SLUG_ATTEMPTS - 1:
+                raise HTTPException(status_code=409, detail="Slug já está em uso.")
+
+    slug, qr_png, qr_svg = doc["slug"], doc["qr_png"], doc["qr_svg"]
+
+    # arquivos só depois do insert, para nunca sobrescrever o QR de outro link
+    try:
+        await asyncio.to_thread(generate_qr, slug)
+    except Exception:
+        await db.links.delete_one({"_id": doc["_id"]})
+        raise
 
+    _links_changed()
     log.info("admin-link-created", slug=slug, original_url=url)
-    return ShortenResponse(slug=slug, qr_png=qr_png, qr_svg=qr_svg)
+    return {"slug": slug, "qr_png": qr_png, "qr_svg": qr_svg}
 
 
 @router.get(
@@ -133,74 +445,47 @@ async def list_links(
     date_to: Optional[date] = Query(None),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    include_qr: bool = Query(False, description="Inclui qr_png/qr_svg na resposta"),
 ) -> Any:
-    filters: Dict[str, Any] = {}
-
-    if slug:
-        filters["slug"] = {"$regex": slug, "$options": "i"}
-    if title:
-        filters["title"] = {"$regex": title, "$options": "i"}
-    if original_url:
-        filters["original_url"] = {"$regex": original_url, "$options": "i"}
-    if callback_url:
-        filters["callback_url"] = {"$regex": callback_url, "$options": "i"}
-    if notes:
-        filters["notes"] = {"$regex": notes, "$options": "i"}
-    if tag:
-        filters["tags"] = tag
-    if is_active is not None:
-        filters["is_active"] = is_active
-
-    if date_from or date_to:
-        dt_filter: Dict[str, Any] = {}
-        if date_from:
-            start = datetime.combine(date_from, time.min).replace(tzinfo=timezone.utc)
-            dt_filter["$gte"] = start
-        if date_to:
-            end = datetime.combine(date_to, time.max).replace(tzinfo=timezone.utc)
-            dt_filter["$lte"] = end
-        filters["created_at"] = dt_filter
+    filters = _link_filters(
+        slug=slug,
+        title=title,
+        original_url=original_url,
+        callback_url=callback_url,
+        notes=notes,
+        tag=tag,
+        is_active=is_active,
+        date_from=date_from,
+        date_to=date_to,
+    )
 
     skip = (page - 1) * page_size
+    projection = LINK_PROJECTION if include_qr else LINK_PROJECTION_NO_QR
 
     cursor = (
         db.links
-        .find(filters)
+        .find(filters, projection=projection)
         .sort("created_at", -1)
         .skip(skip)
         .limit(page_size)
+        .batch_size(page_size)
     )
 
-    results: List[Dict[str, Any]] = []
-    async for doc in cursor:
-        results.append(
-            {
-                "id": str(doc["_id"]),
-                "slug": doc.get("slug"),
-                "original_url": doc.get("original_url"),
-                "title": doc.get("title"),
-                "notes": doc.get("notes"),
-                "tags": doc.get("tags") or [],
-                "is_active": bool(doc.get("is_active")),
-                "callback_url": doc.get("callback_url"),
-                "status": doc.get("status"),
-                "created_at": doc.get("created_at"),
-                "updated_at": doc.get("updated_at"),
-                "expires_at": doc.get("expires_at"),
-                "max_clicks": doc.get("max_clicks"),
-                "click_count": doc.get("click_count", 0),
-                "qr_png": doc.get("qr_png"),
-                "qr_svg": doc.get("qr_svg"),
-            }
-        )
-
-    total = await db.links.count_documents(filters)
+    # página (sort pelo índice de created_at) e total em paralelo
+    docs, total = await asyncio.gather(
+        cursor.to_list(length=page_size),
+        _count_links(filters),
+    )
+    results = [_link_out(doc) for doc in docs]
+    # total limitado: além de COUNT_LIMIT só dá para afirmar que há mais páginas
+    has_more = total > skip + len(results) or (total >= COUNT_LIMIT and len(results) == page_size)
 
     return {
         "data": results,
         "page": page,
         "page_size": page_size,
         "total": total,
+        "has_more": has_more,
     }
 
 
@@ -219,71 +504,40 @@ async def export_links(
     date_from: Optional[date] = Query(None),
     date_to: Optional[date] = Query(None),
 ):
-    filters: Dict[str, Any] = {}
-
-    if slug:
-        filters["slug"] = {"$regex": slug, "$options": "i"}
-    if title:
-        filters["title"] = {"$regex": title, "$options": "i"}
-    if original_url:
-        filters["original_url"] = {"$regex": original_url, "$options": "i"}
-    if notes:
-        filters["notes"] = {"$regex": notes, "$options": "i"}
-    if tag:
-        filters["tags"] = tag
-    if is_active is not None:
-        filters["is_active"] = is_active
-
-    if date_from or date_to:
-        dt_filter: Dict[str, Any] = {}
-        if date_from:
-            dt_filter["$gte"] = datetime.combine(date_from, time.min).replace(tzinfo=timezone.utc)
-        if date_to:
-            dt_filter["$lte"] = datetime.combine(date_to, time.max).replace(tzinfo=timezone.utc)
-        filters["created_at"] = dt_filter
+    filters = _link_filters(
+        slug=slug,
+        title=title,
+        original_url=original_url,
+        notes=notes,
+        tag=tag,
+        is_active=is_active,
+        date_from=date_from,
+        date_to=date_to,
+    )
 
-    cursor = db.links.find(filters).sort("created_at", -1)
+    cursor = (
+        db.links
+        .find(filters, projection=EXPORT_PROJECTION)
+        .sort("created_at", -1)
+        .batch_size(EXPORT_BATCH_SIZE)
+    )
 
     async def csv_generator():
-        buf = io.StringIO()
-        writer = csv.writer(buf)
-
-        writer.writerow([
-            "id",
-            "slug",
-            "original_url",
-            "title",
-            "notes",
-            "tags",
-            "is_active",
-            "created_at",
-            "updated_at",
-            "expires_at",
-            "max_clicks",
-            "click_count",
-            "callback_url",
-        ])
-        yield buf.getvalue()
-        buf.seek(0); buf.truncate(0)
-
-        async for doc in cursor:
-            writer.writerow([
-                doc.get("id"),
-                doc.get("slug"),
-                doc.get("original_url"),
-                doc.get("title"),
-                doc.get("notes"),
-                "|".join(doc.get("tags") or []),
-                doc.get("is_active"),
-                doc.get("created_at").isoformat() if doc.get("created_at") else "",
-                doc.get("updated_at").isoformat() if doc.get("updated_at") else "",
-                doc.get("expires_at").isoformat() if doc.get("expires_at") else "",
-                doc.get("max_clicks") if doc.get("max_clicks") is not None else "",
-                doc.get("click_count", 0),
-                doc.get("callback_url") or "",
-            ])
-            yield buf.getvalue()
-            buf.seek(0); buf.truncate(0)
+        yield _encode_csv_rows([EXPORT_COLUMNS])
+
+        # um await por lote do cursor; a formatação roda no threadpool
+        # para não travar o event loop em exports grandes. O próximo lote
+        # já é buscado enquanto o atual é formatado (no máximo 1 à frente).
+        pending = asyncio.ensure_future(cursor.to_list(length=EXPORT_BATCH_SIZE))
+        try:
+            while True:
+                docs = await pending
+                if not docs:
+                    break
+                pending = asyncio.ensure_future(cursor.to_list(length=EXPORT_BATCH_SIZE))
+                yield await run_in_threadpool(_encode_export_batch, docs)
+        finally:
+            pending.cancel()
 
     now = datetime.now().strftime("%Y%m%d-%H%M")
     filename = f"links-{now}.csv"
@@ -302,33 +556,13 @@ async def export_links(
     dependencies=[Depends(admin_required)],
 )
 async def get_link(link_id: str = Path(..., title="ID do link")):
-    try:
-        oid = ObjectId(link_id)
-    except Exception:
-        raise HTTPException(status_code=400, detail="ID inválido")
+    oid = _oid(link_id)
 
-    doc = await db.links.find_one({"_id": oid})
+    doc = await db.links.find_one({"_id": oid}, projection=LINK_PROJECTION)
     if not doc:
         raise HTTPException(status_code=404, detail="Link não encontrado")
 
-    return { 
-        "id": str(doc["_id"]),
-        "slug": doc.get("slug"),
-        "original_url": doc.get("original_url"),
-        "title": doc.get("title"),
-        "notes": doc.get("notes"),
-        "tags": doc.get("tags") or [],
-        "is_active": bool(doc.get("is_active")),
-        "callback_url": doc.get("callback_url"),
-        "status": doc.get("status"),
-        "created_at": doc.get("created_at"),
-        "updated_at": doc.get("updated_at"),
-        "expires_at": doc.get("expires_at"),
-        "max_clicks": doc.get("max_clicks"),
-        "click_count": doc.get("click_count", 0),
-        "qr_png": doc.get("qr_png"),
-        "qr_svg": doc.get("qr_svg"),
-    }
+    return _link_out(doc)
 
 
 @router.patch(
@@ -344,10 +578,7 @@ async def update_link(
     is_active: Optional[bool] = Query(None),
     callback_url: Optional[str] = Query(None),
 ):
-    try:
-        oid = ObjectId(link_id)
-    except Exception:
-        raise HTTPException(status_code=400, detail="ID inválido")
+    oid = _oid(link_id)
 
     update_fields: Dict[str, Any] = {
         "updated_at": datetime.now(timezone.utc),
@@ -355,6 +586,7 @@ async def update_link(
 
     if title is not None:
         update_fields["title"] = title
+        update_fields["title_lc"] = title.lower()
     if original_url is not None:
         update_fields["original_url"] = original_url
     if notes is not None:
@@ -367,33 +599,18 @@ async def update_link(
     if callback_url is not None:
         update_fields["callback_url"] = callback_url
 
-    result = await db.links.update_one({"_id": oid}, {"$set": update_fields})
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Link não encontrado")
-
-    doc = await db.links.find_one({"_id": oid})
+    doc = await db.links.find_one_and_update(
+        {"_id": oid},
+        {"$set": update_fields},
+        return_document=ReturnDocument.AFTER,
+        projection=LINK_PROJECTION,
+    )
     if not doc:
-        raise HTTPException(status_code=500, detail="Documento não existe após update")
+        raise HTTPException(status_code=404, detail="Link não encontrado")
 
+    _links_changed()
     log.info("admin-link-updated", id=link_id, updates=list(update_fields.keys()))
-    return { 
-        "id": str(doc["_id"]),
-        "slug": doc.get("slug"),
-        "original_url": doc.get("original_url"),
-        "title": doc.get("title"),
-        "notes": doc.get("notes"),
-        "tags": doc.get("tags") or [],
-        "is_active": bool(doc.get("is_active")),
-        "callback_url": doc.get("callback_url"),
-        "status": doc.get("status"),
-        "created_at": doc.get("created_at"),
-        "updated_at": doc.get("updated_at"),
-        "expires_at": doc.get("expires_at"),
-        "max_clicks": doc.get("max_clicks"),
-        "click_count": doc.get("click_count", 0),
-        "qr_png": doc.get("qr_png"),
-        "qr_svg": doc.get("qr_svg"),
-    }
+    return _link_out(doc)
 
 
 @router.delete(
@@ -401,19 +618,20 @@ async def update_link(
     dependencies=[Depends(admin_required)],
     status_code=204,
 )
-async def delete_link(link_id: str = Path(..., description="ID do link a ser excluído")):
+async def delete_link(
+    background_tasks: BackgroundTasks,
+    link_id: str = Path(..., description="ID do link a ser excluído"),
+):
     """
-    Renomeia o slug nos access_logs e remove o link.
+    Remove o link. Os access_logs são renomeados antes da exclusão (um slug
+    reaproveitado nunca herda os logs antigos); os arquivos de QR são
+    apagados depois da resposta.
     """
-    try:
-        oid = ObjectId(link_id)
-    except Exception:
-        raise HTTPException(status_code=400, detail="ID inválido")
+    oid = _oid(link_id)
 
-    link = await db.links.find_one({"_id": oid})
+    link = await db.links.find_one({"_id": oid}, projection={"slug": 1})
     if not link:
         raise HTTPException(status_code=404, detail="Link não encontrado")
-
     slug = link.get("slug")
     if not slug:
         raise HTTPException(status_code=400, detail="Documento sem slug")
@@ -421,19 +639,32 @@ async def delete_link(link_id: str = Path(..., description="ID do link a ser exc
     timestamp = datetime.now().strftime("%Y-%m-%d")
     new_slug = f"{slug}_deleted_{timestamp}"
 
-    await db.access_logs.update_many({"slug": slug}, {"$set": {"slug": new_slug}})
+    # falha aqui mantém o link: o admin pode repetir o delete
+    try:
+        modified = await _rename_access_logs(slug, new_slug)
+    except PyMongoError as e:
+        log.error("access-logs-rename-failed", slug=slug, new_slug=new_slug, error=str(e))
+        raise HTTPException(status_code=500, detail="Falha ao versionar os logs do link")
 
-    await db.links.delete_one({"_id": oid})
+    if not await db.links.find_one_and_delete({"_id": oid, "slug": slug}, projection={"_id": 1}):
+        raise HTTPException(status_code=404, detail="Link não encontrado")
+    deleted_at = datetime.now(timezone.utc)
+    _links_changed()
 
-    for ext in ["png", "svg"]:
-        path = f"./src/static/qrs/{slug}.{ext}"
+    # logs de redirects que acharam o link antes do delete: espera só o que
+    # já estava no buffer do AccessLogWriter (não a fila inteira) e renomeia;
+    # se o flush estourar, o rename restante roda depois da resposta
+    if await access_log_writer.flush(timeout=DELETE_FLUSH_TIMEOUT):
         try:
-            os.remove(path)
-            log.info("qr-code-deleted", path=path)
-        except FileNotFoundError:
-            pass
+            modified += await _rename_access_logs(slug, new_slug, deleted_at)
+        except PyMongoError as e:
+            log.error("access-logs-rename-failed", slug=slug, new_slug=new_slug, error=str(e))
+    else:
+        background_tasks.add_task(_rename_late_access_logs, slug, new_slug, deleted_at)
+
+    background_tasks.add_task(_remove_qr_files, slug)
 
-    log.info("admin-link-deleted", id=link_id, slug=slug, new_slug=new_slug)
+    log.info("admin-link-deleted", id=link_id, slug=slug, new_slug=new_slug, logs_renamed=modified)
     return
 
 
@@ -441,25 +672,22 @@ async def delete_link(link_id: str = Path(..., description="ID do link a ser exc
     "/links/{slug}/logs",
     dependencies=[Depends(admin_required)],
 )
-async def get_link_access_logs(slug: str, limit: int = 50):
+async def get_link_access_logs(slug: str, limit: int = Query(50, ge=1)):
     """
     Lista logs do slug.
     """
-    sort_field = "ts"
-    cursor = (
-        db.access_logs
-        .find({"slug": slug})
-        .sort(sort_field, -1)
-        .limit(limit)
-    )
+    pipeline = [
+        {"$match": {"slug": slug}},
+        {"$sort": {"ts": -1}},
+        {"$limit": limit},
+        {"$project": ACCESS_LOG_OUTPUT},
+    ]
 
-    logs_out: List[Dict[str, Any]] = []
-    async for doc in cursor:
-        doc["_id"] = str(doc["_id"])
-        # normaliza timestamp de saída
-        if doc.get("ts") and isinstance(doc["ts"], datetime):
-            doc["timestamp"] = doc["ts"].isoformat()
-        logs_out.append(doc)
+    try:
+        logs_out: List[Dict[str, Any]] = await db.access_logs.aggregate(pipeline).to_list(length=limit)
+    except PyMongoError as e:
+        log.error("admin-access-logs-failed", slug=slug, error=str(e))
+        raise HTTPException(status_code=500, detail="Erro ao buscar logs")
 
     if not logs_out:
         raise HTTPException(status_code=204, detail="Nenhum log encontrado para este link")
@@ -472,119 +700,183 @@ async def get_link_access_logs(slug: str, limit: int = 50):
     dependencies=[Depends(admin_required)],
 )
 async def export_access_logs(slug: str):
-    cursor = db.access_logs.find({"slug": slug}).sort("ts", -1)
-
-    docs: List[Dict[str, Any]] = []
-    async for doc in cursor:
-        doc["_id"] = str(doc["_id"])
-        if doc.get("ts") and isinstance(doc["ts"], datetime):
-            doc["timestamp"] = doc["ts"].isoformat()
-        docs.append(doc)
-
-    if not docs:
-        raise HTTPException(status_code=404, detail="Nenhum log encontrado")
+    cursor = db.access_logs.aggregate(
+        [
+            {"$match": {"slug": slug}},
+            {"$sort": {"ts": -1}},
+            {"$project": ACCESS_LOG_OUTPUT},
+        ],
+        batchSize=ACCESS_LOG_BATCH_SIZE,
+    )
 
-    output = io.StringIO()
-    fieldnames = sorted({k for d in docs for k in d.keys()})
+    async def csv_generator():
+        # colunas fixas: o cabeçalho sai antes do primeiro lote do cursor
+        yield _encode_csv_rows([ACCESS_LOG_COLUMNS])
 
-    writer = csv.DictWriter(output, fieldnames=fieldnames)
-    writer.writeheader()
-    writer.writerows(docs)
+        try:
+            while True:
+                docs = await cursor.to_list(length=ACCESS_LOG_BATCH_SIZE)
+                if not docs:
+                    break
+                yield await run_in_threadpool(_encode_access_log_batch, docs)
+        except PyMongoError as e:
+            log.error("admin-access-logs-export-failed", slug=slug, error=str(e))
+            raise
 
     now = datetime.now().strftime("%Y%m%d-%H%M")
     filename = f"accesslog-{slug}-{now}.csv"
 
     return StreamingResponse(
-        iter([output.getvalue()]),
+        csv_generator(),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={filename}"},
     )
 
 
-@router.post("/qr/regenerate", dependencies=[Depends(admin_required)], response_model=RegenerateQrResponse)
+@router.post(
+    "/qr/regenerate",
+    dependencies=[Depends(admin_required)],
+    responses={200: {"model": RegenerateQrResponse}},
+)
 async def regenerate_qr_codes(payload: RegenerateQrRequest = Body(...)):
     """
     Regenera QR codes para um ou vários slugs.
     - Cria/overwrite /app/src/static/qrs/{slug}.png e .svg
     - Atualiza o link: is_active=true, status=valid, qr_png/qr_svg, updated_at
     """
+    return await _regenerate(_regen_slugs(payload), payload.force)
+
+
+@router.post(
+    "/qr/regenerate/jobs",
+    dependencies=[Depends(admin_required)],
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def start_regenerate_job(payload: RegenerateQrRequest = Body(...)):
+    """
+    Mesma regeneração de /qr/regenerate, mas em segundo plano: responde na
+    hora com o task_id; o resultado sai em GET /qr/regenerate/jobs/{task_id}.
+    """
+    slugs = _regen_slugs(payload)
+    task_id = shortuuid.uuid()
+    job = {"task_id": task_id, "status": "pending", "requested": len(slugs), "result": None}
+    _regen_jobs[task_id] = job
+
+    task = asyncio.create_task(_run_regen_job(job, slugs, payload.force))
+    _regen_tasks.add(task)
+    task.add_done_callback(_regen_tasks.discard)
+
+    return job
+
+
+@router.get(
+    "/qr/regenerate/jobs/{task_id}",
+    dependencies=[Depends(admin_required)],
+)
+async def get_regenerate_job(task_id: str):
+    job = _regen_jobs.get(task_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Tarefa não encontrada")
+    return job
+
+
+def _regen_slugs(payload: RegenerateQrRequest) -> List[str]:
     if not payload.slug and not payload.slugs:
         raise HTTPException(status_code=400, detail="Provide either 'slug' or 'slugs'.")
 
-    slugs: List[str] = []
-    if payload.slug:
-        slugs.append(payload.slug)
-    if payload.slugs:
-        slugs.extend(payload.slugs)
+    # dedup preservando a ordem
+    return list(dict.fromkeys(
+        s for s in (payload.slug, *(payload.slugs or [])) if s
+    ))
 
-    seen = set()
-    slugs = [s for s in slugs if s and not (s in seen or seen.add(s))]
 
-    base_url = settings.BASE_URL.rstrip("/")
-    now = datetime.now(timezone.utc)
+async def _run_regen_job(job: Dict[str, Any], slugs: List[str], force: bool) -> None:
+    try:
+        job["result"] = await _regenerate(slugs, force)
+        job["status"] = "done"
+    except Exception as e:
+        log.error("admin-qr-regenerate-job-failed", task_id=job["task_id"], error=str(e))
+        job["status"] = "failed"
+        job["error"] = str(e)
 
-    updated = 0
-    results: List[RegenerateQrResult] = []
 
-    for slug in slugs:
-        doc = await db.links.find_one({"slug": slug})
-        if not doc:
-            results.append(RegenerateQrResult(slug=slug, ok=False, reason="link_not_found"))
-            continue
+async def _regenerate(slugs: List[str], force: bool) -> Dict[str, Any]:
+    now = datetime.now(timezone.utc)
 
-        try:
-            png_path = f"/app/src/static/qrs/{slug}.png"
-            svg_path = f"/app/src/static/qrs/{slug}.svg"
-
-            if not payload.force and os.path.exists(png_path) and os.path.exists(svg_path):
-                qr_png = f"{base_url}/src/static/qrs/{slug}.png"
-                qr_svg = f"{base_url}/src/static/qrs/{slug}.svg"
-
-                res = await db.links.update_one(
-                    {"_id": doc["_id"]},
-                    {"$set": {
-                        "qr_png": qr_png,
-                        "qr_svg": qr_svg,
-                        "is_active": True,
-                        "status": "valid",
-                        "updated_at": now,
-                    }},
-                )
-                if res.modified_count:
-                    updated += 1
-
-                results.append(RegenerateQrResult(slug=slug, ok=True, reason="skipped_files_exist", qr_png=qr_png, qr_svg=qr_svg))
-                continue
-
-            qr_png_rel, qr_svg_rel = generate_qr(slug)
-            if "/" in qr_png_rel:
-                qr_png_url = f"{base_url}/{qr_png_rel.lstrip('/')}"
-            else:
-                qr_png_url = f"{base_url}/{qr_png_rel}"
-
-            if "/" in qr_svg_rel:
-                qr_svg_url = f"{base_url}/{qr_svg_rel.lstrip('/')}"
-            else:
-                qr_svg_url = f"{base_url}/{qr_svg_rel}"
-
-            res = await db.links.update_one(
-                {"_id": doc["_id"]},
-                {"$set": {
-                    "qr_png": qr_png_url,
-                    "qr_svg": qr_svg_url,
-                    "is_active": True,
-                    "status": "valid",
-                    "updated_at": now,
-                }},
+    # um único scandir no lugar de dois stat() por slug
+    existing: Set[str] = set() if force else await asyncio.to_thread(_existing_qr_files)
+
+    # um find para todos os slugs em vez de um find_one por slug
+    docs = await db.links.find(
+        {"slug": {"$in": slugs}},
+        projection={"_id": 1, "slug": 1},
+    ).to_list(length=len(slugs))
+    ids: Dict[str, ObjectId] = {d["slug"]: d["_id"] for d in docs}
+    found = [slug for slug in slugs if slug in ids]
+
+    prepared: Dict[str, Any] = {}
+    to_generate: List[str] = []
+    for slug in found:
+        if f"{slug}.png" in existing and f"{slug}.svg" in existing:
+            prepared[slug] = (
+                QR_PNG_URL.format(slug=slug),
+                QR_SVG_URL.format(slug=slug),
+                "skipped_files_exist",
             )
+        else:
+            to_generate.append(slug)
+
+    # encode dos QRs em paralelo no pool de processos (CPU-bound, segura o GIL)
+    generated: List[Any] = []
+    if to_generate:
+        loop = asyncio.get_running_loop()
+        pool = get_qr_pool()
+        generated = await asyncio.gather(
+            *(loop.run_in_executor(pool, generate_qr, slug) for slug in to_generate),
+            return_exceptions=True,
+        )
+    for slug, outcome in zip(to_generate, generated):
+        if isinstance(outcome, BaseException):
+            prepared[slug] = outcome
+            continue
+        qr_png_rel, qr_svg_rel = outcome
+        prepared[slug] = (
+            f"{BASE_URL}/{qr_png_rel.lstrip('/')}",
+            f"{BASE_URL}/{qr_svg_rel.lstrip('/')}",
+            None,
+        )
+
+    ops: List[UpdateOne] = []
+    results: List[Dict[str, Any]] = []
 
-            if res.modified_count:
-                updated += 1
+    for slug in slugs:
+        outcome = prepared.get(slug)
+        if outcome is None:
+            results.append(_regen_result(slug, False, reason="link_not_found"))
+            continue
+        if isinstance(outcome, BaseException):
+            results.append(_regen_result(slug, False, reason=str(outcome)))
+            continue
 
-            results.append(RegenerateQrResult(slug=slug, ok=True, qr_png=qr_png_url, qr_svg=qr_svg_url))
+        qr_png, qr_svg, reason = outcome
+        ops.append(UpdateOne(
+            {"_id": ids[slug]},
+            {"$set": {
+                "qr_png": qr_png,
+                "qr_svg": qr_svg,
+                "is_active": True,
+                "status": "valid",
+                "updated_at": now,
+            }},
+        ))
+        results.append(_regen_result(slug, True, reason=reason, qr_png=qr_png, qr_svg=qr_svg))
 
-        except Exception as e:
-            results.append(RegenerateQrResult(slug=slug, ok=False, reason=str(e)))
+    updated = 0
+    if ops:
+        res = await db.links.bulk_write(ops, ordered=False)
+        updated = res.modified_count
+        # is_active/status mudaram: totais e overview em cache ficam velhos
+        _links_changed()
 
     log.info("admin-qr-regenerate", updated=updated, requested=len(slugs))
-    return RegenerateQrResponse(updated=updated, results=results)
+    return {"updated": updated, "results": results}
@@ -2,24 +2,23 @@ import jwt
 import bcrypt
 from datetime import datetime, timezone, timedelta
 
-from fastapi import APIRouter, HTTPException, Depends, Header, Request
+from fastapi import APIRouter, HTTPException, Depends, Header
 from fastapi.security import HTTPBearer, OAuth2PasswordRequestForm
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 
 from core.config import settings
 from core.db import db
+from core.templates import page_response
 from schemas.user import TokenResponse, CreateUserRequest
 
 
 router = APIRouter(prefix="/auth")
 security = HTTPBearer()
-templates = Jinja2Templates(directory="src/static/templates")
 
 
 @router.get("/", response_class=HTMLResponse)
-async def index(request: Request):
-    return templates.TemplateResponse("login.html", {"request": request})
+async def index():
+    return page_response("login.html")
 
 # Admin Login via JWT
 def generate_jwt(username: str, role: str):
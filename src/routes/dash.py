@@ -1,19 +1,17 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
-import jwt
 import structlog
-from fastapi import APIRouter, Depends, HTTPException, Query, Security
-from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from cachetools import TTLCache
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 
-from core.config import settings
 from core.db import db
+from core.security import admin_required
+from core.versions import links_version
 from schemas.dash import (
-    AccessLogItem,
-    DateRangeOut,
-    LinkListItem,
     LinkStatsResponse,
     OverviewResponse,
     PaginatedAccessLogsResponse,
@@ -22,303 +20,441 @@ from schemas.dash import (
     TopLinkItem,
 )
 from utils.dash_range import resolve_range
+from utils.filters import contains_regex, prefix_regex
 
 router = APIRouter(prefix="/dash", tags=["dash"])
 log = structlog.get_logger()
-bearer = HTTPBearer(auto_error=False)
 
+# teto no servidor para agregações do dashboard (janelas grandes não
+# seguram conexão do pool indefinidamente)
+DASH_MAX_TIME_MS = 10_000
 
-async def admin_required(
-    credentials: HTTPAuthorizationCredentials = Security(bearer),
-):
-    if not credentials or not credentials.credentials:
-        raise HTTPException(status_code=401, detail="Credenciais ausentes")
-
-    try:
-        payload = jwt.decode(
-            credentials.credentials,
-            settings.JWT_SECRET,
-            algorithms=[settings.JWT_ALGORITHM],
-        )
-    except jwt.PyJWTError:
-        raise HTTPException(status_code=401, detail="Token inválido")
-
-    return payload
+OVERVIEW_CACHE_TTL = 30
 
+# JSON do /dash/overview por (versão dos links, from, to, tz, top); todos os
+# admins abrindo a página inicial na mesma janela compartilham uma agregação
+_overview_cache: "TTLCache[Tuple[int, Optional[str], Optional[str], str, int], bytes]" = TTLCache(
+    maxsize=256,
+    ttl=OVERVIEW_CACHE_TTL,
+)
 
-def _ts_add_fields_stage() -> Dict[str, Any]:
+ACCESS_LOG_ITEM_FIELDS = [
+    "ip",
+    "user_agent",
+    "referer",
+    "browser",
+    "os",
+    "device",
+    "is_mobile",
+    "is_tablet",
+    "is_pc",
+    "country",
+    "region",
+    "city",
+]
+
+DASH_LINK_PROJECTION = {
+    "slug": 1,
+    "original_url": 1,
+    "title": 1,
+    "notes": 1,
+    "tags": 1,
+    "is_active": 1,
+    "created_at": 1,
+    "expires_at": 1,
+    "max_clicks": 1,
+}
+
+
+def _ts_match_range_stage(from_utc: datetime, to_utc: datetime, **match: Any) -> Dict[str, Any]:
     """
-    Converte para Date em campo 'ts' via $dateFromString.
-    Assume UTC quando não há timezone explícito.
+    $match no campo ts (BSON date gravado pelo redirect), indexado.
+    Filtros extras (ex.: slug) entram no mesmo estágio.
     """
-    return {
-        "$addFields": {
-            "ts": {
-                "$dateFromString": {
-                    "dateString": "$timestamp",
-                    "onError": None,
-                    "onNull": None,
-                }
-            }
-        }
-    }
-
-
-def _ts_match_range_stage(from_utc: datetime, to_utc: datetime) -> Dict[str, Any]:
     return {
         "$match": {
+            **match,
             "ts": {
                 "$gte": from_utc,
                 "$lte": to_utc,
-            }
+            },
         }
     }
 
 
-def _range_out(rr) -> DateRangeOut:
-    return DateRangeOut(
-        **{
-            "from": rr.from_local,
-            "to": rr.to_local,
-            "tz": rr.tz,
-        }
-    )
-
-
-@router.get("/overview", response_model=OverviewResponse, dependencies=[Depends(admin_required)])
-async def overview(
-    from_: Optional[str] = Query(None, alias="from"),
-    to: Optional[str] = Query(None),
-    tz: str = Query("America/Sao_Paulo"),
-    top: int = Query(10, ge=1, le=50),
-):
-    rr = resolve_range(from_, to, tz_name=tz, default_days=7)
-
-    # clicks_total + unique_ips
-    pipeline_summary = [
-        _ts_add_fields_stage(),
-        _ts_match_range_stage(rr.from_utc, rr.to_utc),
+def _clicks_summary_stages() -> List[Dict[str, Any]]:
+    """
+    Cliques, IPs únicos e último clique em dois $group: primeiro por ip,
+    depois soma. Evita o $addToSet com todos os IPs da janela em memória.
+    """
+    return [
         {
             "$group": {
-                "_id": None,
-                "clicks_total": {"$sum": 1},
-                "ips": {"$addToSet": "$ip"},
+                "_id": "$ip",
+                "clicks": {"$sum": 1},
                 "last_click": {"$max": "$ts"},
             }
         },
         {
-            "$project": {
-                "_id": 0,
-                "clicks_total": 1,
-                "unique_ips": {"$size": "$ips"},
-                "last_click": 1,
+            "$group": {
+                "_id": None,
+                "clicks_total": {"$sum": "$clicks"},
+                "unique_ips": {"$sum": 1},
+                "last_click": {"$max": "$last_click"},
             }
         },
+        {"$project": {"_id": 0}},
     ]
 
-    summary = await db.access_logs.aggregate(pipeline_summary).to_list(length=1)
-    summary = summary[0] if summary else {"clicks_total": 0, "unique_ips": 0, "last_click": None}
-
-    # links_total / links_active
-    links_total = await db.links.count_documents({})
-    links_active = await db.links.count_documents({"is_active": True})
 
-    pipeline_series = [
-        _ts_add_fields_stage(),
-        _ts_match_range_stage(rr.from_utc, rr.to_utc),
+def _clicks_by_slug_stages() -> List[Dict[str, Any]]:
+    """
+    Cliques, IPs únicos e último clique por slug, nos mesmos dois $group
+    do resumo (por slug+ip e depois por slug).
+    """
+    return [
         {
             "$group": {
-                "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$ts"}},
+                "_id": {"slug": "$slug", "ip": "$ip"},
                 "clicks": {"$sum": 1},
+                "last_click": {"$max": "$ts"},
             }
         },
-        {"$sort": {"_id": 1}},
-        {"$project": {"_id": 0, "bucket": "$_id", "clicks": 1}},
-    ]
-    series_docs = await db.access_logs.aggregate(pipeline_series).to_list(length=5000)
-    series = [SeriesPoint(**d) for d in series_docs]
-
-    # top_links
-    pipeline_top = [
-        _ts_add_fields_stage(),
-        _ts_match_range_stage(rr.from_utc, rr.to_utc),
         {
             "$group": {
-                "_id": "$slug",
-                "clicks": {"$sum": 1},
-                "last_click": {"$max": "$ts"},
+                "_id": "$_id.slug",
+                "clicks": {"$sum": "$clicks"},
+                "unique_ips": {"$sum": 1},
+                "last_click": {"$max": "$last_click"},
             }
         },
-        {"$sort": {"clicks": -1}},
-        {"$limit": top},
+    ]
+
+
+async def _links_page_by_created(
+    filters: Dict[str, Any],
+    rr,
+    skip: int,
+    page_size: int,
+) -> List[Dict[str, Any]]:
+    """
+    Página ordenada por created_at: busca os links primeiro e depois as
+    métricas de todos os slugs da página numa única agregação.
+    """
+    docs = await (
+        db.links
+        .find(filters, projection=DASH_LINK_PROJECTION)
+        .sort("created_at", -1)
+        .skip(skip)
+        .limit(page_size)
+        .batch_size(page_size)
+        .max_time_ms(DASH_MAX_TIME_MS)
+    ).to_list(length=page_size)
+
+    slugs = [d["slug"] for d in docs if d.get("slug")]
+    if not slugs:
+        return docs
+
+    pipeline = [
+        _ts_match_range_stage(rr.from_utc, rr.to_utc, slug={"$in": slugs}),
+        *_clicks_by_slug_stages(),
+    ]
+    rows = await db.access_logs.aggregate(
+        pipeline,
+        batchSize=len(slugs),
+        maxTimeMS=DASH_MAX_TIME_MS,
+    ).to_list(length=len(slugs))
+    metrics = {r.pop("_id"): r for r in rows}
+
+    for d in docs:
+        d.update(metrics.get(d["slug"], {}))
+    return docs
+
+
+async def _links_page_by_metric(
+    filters: Dict[str, Any],
+    rr,
+    sort_field: str,
+    skip: int,
+    page_size: int,
+) -> List[Dict[str, Any]]:
+    """
+    Página ordenada por clicks/last_click, partindo de access_logs: o range
+    de ts (indexado) é agrupado por slug e só os slugs com clique na janela
+    passam pelo $lookup em links — um ponto no índice único de slug, que
+    também aplica os filtros e descarta slugs de links removidos.
+    Links sem clique na janela vêm depois de todos os clicados, por
+    created_at.
+    """
+    pipeline = [
+        _ts_match_range_stage(rr.from_utc, rr.to_utc),
+        *_clicks_by_slug_stages(),
         {
             "$lookup": {
                 "from": "links",
                 "localField": "_id",
                 "foreignField": "slug",
+                "pipeline": [
+                    {"$match": filters},
+                    {"$project": DASH_LINK_PROJECTION},
+                ],
                 "as": "link",
             }
         },
-        {"$unwind": {"path": "$link", "preserveNullAndEmptyArrays": True}},
+        {"$unwind": "$link"},
+        {"$sort": {sort_field: -1, "link.created_at": -1, "_id": 1}},
         {
-            "$project": {
-                "_id": 0,
-                "slug": "$_id",
-                "clicks": 1,
-                "last_click": 1,
-                "title": "$link.title",
-                "original_url": "$link.original_url",
+            "$facet": {
+                "page": [{"$skip": skip}, {"$limit": page_size}],
+                "clicked": [{"$count": "n"}],
             }
         },
     ]
-    top_docs = await db.access_logs.aggregate(pipeline_top).to_list(length=top)
-    top_links = [TopLinkItem(**d) for d in top_docs]
+    result = await db.access_logs.aggregate(
+        pipeline,
+        maxTimeMS=DASH_MAX_TIME_MS,
+    ).to_list(length=1)
+    page = result[0]["page"] if result else []
+    clicked = result[0]["clicked"][0]["n"] if result and result[0]["clicked"] else 0
+
+    docs = [
+        {
+            **r["link"],
+            "clicks": r["clicks"],
+            "unique_ips": r["unique_ips"],
+            "last_click": r["last_click"],
+        }
+        for r in page
+    ]
 
-    return OverviewResponse(
-        range=_range_out(rr),
-        clicks_total=int(summary.get("clicks_total", 0)),
-        unique_ips=int(summary.get("unique_ips", 0)),
-        links_total=links_total,
-        links_active=links_active,
-        top_links=top_links,
-        series=series,
-    )
+    missing = page_size - len(docs)
+    if missing <= 0:
+        return docs
+
+    # a página passou do fim dos clicados: completa com os links sem clique.
+    # Anti-join a partir de links (na ordem do índice de created_at): cada
+    # link verifica no máximo um log da janela pelo índice (slug, ts), e o
+    # pipeline para assim que a página enche, sem montar a lista de slugs
+    # clicados (que não tem limite de tamanho)
+    zero_pipeline = [
+        {"$match": filters},
+        {"$sort": {"created_at": -1}},
+        {
+            "$lookup": {
+                "from": "access_logs",
+                "localField": "slug",
+                "foreignField": "slug",
+                "pipeline": [
+                    _ts_match_range_stage(rr.from_utc, rr.to_utc),
+                    {"$limit": 1},
+                    {"$project": {"_id": 1}},
+                ],
+                "as": "hit",
+            }
+        },
+        {"$match": {"hit": {"$size": 0}}},
+        {"$skip": max(0, skip - clicked)},
+        {"$limit": missing},
+        {"$project": DASH_LINK_PROJECTION},
+    ]
+    docs += await db.links.aggregate(
+        zero_pipeline,
+        maxTimeMS=DASH_MAX_TIME_MS,
+    ).to_list(length=missing)
+    return docs
 
 
-@router.get("/links", response_model=PaginatedLinksResponse, dependencies=[Depends(admin_required)])
-async def list_links(
+def _range_out(rr) -> Dict[str, Any]:
+    """DateRangeOut já no formato de saída (alias "from")."""
+    return {
+        "from": rr.from_local,
+        "to": rr.to_local,
+        "tz": rr.tz,
+    }
+
+
+@router.get(
+    "/overview",
+    responses={200: {"model": OverviewResponse}},
+    dependencies=[Depends(admin_required)],
+)
+async def overview(
     from_: Optional[str] = Query(None, alias="from"),
     to: Optional[str] = Query(None),
     tz: str = Query("America/Sao_Paulo"),
-
-    q: Optional[str] = Query(None, description="Busca em slug/title/original_url"),
-    tag: Optional[str] = Query(None),
-    is_active: Optional[bool] = Query(None),
-
-    sort: str = Query("clicks_desc", pattern="^(clicks_desc|created_desc|last_click_desc)$"),
-    page: int = Query(1, ge=1),
-    page_size: int = Query(20, ge=1, le=100),
+    top: int = Query(10, ge=1, le=50),
 ):
-    rr = resolve_range(from_, to, tz_name=tz, default_days=7)
-
-    filters: Dict[str, Any] = {}
-
-    if is_active is not None:
-        filters["is_active"] = is_active
-    if tag:
-        filters["tags"] = tag
-    if q:
-        filters["$or"] = [
-            {"slug": {"$regex": q, "$options": "i"}},
-            {"title": {"$regex": q, "$options": "i"}},
-            {"original_url": {"$regex": q, "$options": "i"}},
-        ]
-
-    total = await db.links.count_documents(filters)
+    # mesma consulta (parâmetros crus) reaproveita o JSON por até 30s, ou até
+    # um link ser criado/editado/excluído
+    cache_key = (links_version(), from_, to, tz, top)
+    body = _overview_cache.get(cache_key)
+    if body is None:
+        body = await _overview_body(from_, to, tz, top)
+        _overview_cache[cache_key] = body
+
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"Cache-Control": f"private, max-age={OVERVIEW_CACHE_TTL}"},
+    )
 
-    skip = (page - 1) * page_size
 
-    sort_stage = {"created_desc": {"created_at": -1}}.get(sort, {"created_at": -1})
+async def _overview_body(from_: Optional[str], to: Optional[str], tz: str, top: int) -> bytes:
+    rr = resolve_range(from_, to, tz_name=tz, default_days=7)
 
+    # summary, série e top links numa única passada pelo range de access_logs
     pipeline = [
-        {"$match": filters},
-        {"$sort": sort_stage},
-        {"$skip": skip},
-        {"$limit": page_size},
+        _ts_match_range_stage(rr.from_utc, rr.to_utc),
         {
-            "$lookup": {
-                "from": "access_logs",
-                "let": {"slug": "$slug"},
-                "pipeline": [
-                    _ts_add_fields_stage(),
+            "$facet": {
+                "summary": _clicks_summary_stages(),
+                "series": [
                     {
-                        "$match": {
-                            "$expr": {"$eq": ["$slug", "$$slug"]},
+                        "$group": {
+                            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$ts"}},
+                            "clicks": {"$sum": 1},
                         }
                     },
-                    _ts_match_range_stage(rr.from_utc, rr.to_utc),
+                    {"$sort": {"_id": 1}},
+                    {"$project": {"_id": 0, "bucket": "$_id", "clicks": 1}},
+                ],
+                "top": [
                     {
                         "$group": {
-                            "_id": None,
+                            "_id": "$slug",
                             "clicks": {"$sum": 1},
-                            "ips": {"$addToSet": "$ip"},
                             "last_click": {"$max": "$ts"},
                         }
                     },
+                    {"$sort": {"clicks": -1}},
+                    {"$limit": top},
+                    {
+                        "$lookup": {
+                            "from": "links",
+                            "localField": "_id",
+                            "foreignField": "slug",
+                            "as": "link",
+                        }
+                    },
+                    {"$unwind": {"path": "$link", "preserveNullAndEmptyArrays": True}},
                     {
                         "$project": {
                             "_id": 0,
+                            "slug": "$_id",
                             "clicks": 1,
-                            "unique_ips": {"$size": "$ips"},
                             "last_click": 1,
+                            "title": "$link.title",
+                            "original_url": "$link.original_url",
                         }
                     },
                 ],
-                "as": "metrics",
-            }
-        },
-        {"$unwind": {"path": "$metrics", "preserveNullAndEmptyArrays": True}},
-        {
-            "$addFields": {
-                "clicks": {"$ifNull": ["$metrics.clicks", 0]},
-                "unique_ips": {"$ifNull": ["$metrics.unique_ips", 0]},
-                "last_click": "$metrics.last_click",
-            }
-        },
-        {
-            "$project": {
-                "_id": 1,
-                "slug": 1,
-                "original_url": 1,
-                "title": 1,
-                "notes": 1,
-                "tags": 1,
-                "is_active": 1,
-                "created_at": 1,
-                "expires_at": 1,
-                "max_clicks": 1,
-                "clicks": 1,
-                "unique_ips": 1,
-                "last_click": 1,
             }
         },
     ]
 
-    docs = await db.links.aggregate(pipeline).to_list(length=page_size)
+    # agregação e contagens de links em paralelo
+    agg, links_total, links_active = await asyncio.gather(
+        db.access_logs.aggregate(pipeline, maxTimeMS=DASH_MAX_TIME_MS).to_list(length=1),
+        db.links.estimated_document_count(),
+        db.links.count_documents({"is_active": True}, maxTimeMS=DASH_MAX_TIME_MS),
+    )
+    agg = agg[0] if agg else {}
 
-    items: List[LinkListItem] = []
-    for d in docs:
-        items.append(
-            LinkListItem(
-                id=str(d["_id"]),
-                slug=d["slug"],
-                original_url=d["original_url"],
-                title=d.get("title"),
-                notes=d.get("notes"),
-                tags=d.get("tags", []) or [],
-                is_active=bool(d.get("is_active", True)),
-                created_at=d["created_at"],
-                expires_at=d.get("expires_at"),
-                max_clicks=d.get("max_clicks"),
-                clicks=int(d.get("clicks", 0) or 0),
-                unique_ips=int(d.get("unique_ips", 0) or 0),
-                last_click=d.get("last_click"),
-            )
-        )
-
-    if sort == "clicks_desc":
-        items.sort(key=lambda x: x.clicks, reverse=True)
-    elif sort == "last_click_desc":
-        items.sort(key=lambda x: x.last_click or datetime.min.replace(tzinfo=timezone.utc), reverse=True)
-
-    return PaginatedLinksResponse(
+    summary = (agg.get("summary") or [{}])[0]
+    series = [SeriesPoint(**d) for d in agg.get("series") or []]
+    top_links = [TopLinkItem(**d) for d in agg.get("top") or []]
+
+    return OverviewResponse(
         range=_range_out(rr),
-        page=page,
-        page_size=page_size,
-        total=total,
-        data=items,
+        clicks_total=int(summary.get("clicks_total", 0) or 0),
+        unique_ips=int(summary.get("unique_ips", 0) or 0),
+        links_total=links_total,
+        links_active=links_active,
+        top_links=top_links,
+        series=series,
+    ).model_dump_json(by_alias=True).encode()
+
+
+# listagens paginadas devolvem dicts direto (dados do próprio banco, sem
+# revalidar cada linha no Pydantic); os modelos ficam só na documentação
+@router.get(
+    "/links",
+    responses={200: {"model": PaginatedLinksResponse}},
+    dependencies=[Depends(admin_required)],
+)
+async def list_links(
+    from_: Optional[str] = Query(None, alias="from"),
+    to: Optional[str] = Query(None),
+    tz: str = Query("America/Sao_Paulo"),
+
+    q: Optional[str] = Query(None, description="Busca por prefixo em slug/title e por trecho de original_url"),
+    tag: Optional[str] = Query(None),
+    is_active: Optional[bool] = Query(None),
+
+    sort: str = Query("clicks_desc", pattern="^(clicks_desc|created_desc|last_click_desc)$"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+):
+    rr = resolve_range(from_, to, tz_name=tz, default_days=7)
+
+    filters: Dict[str, Any] = {}
+
+    if is_active is not None:
+        filters["is_active"] = is_active
+    if tag:
+        filters["tags"] = tag
+    if q:
+        # como no /admin/links: slug e título por prefixo ancorado, URL por
+        # substring (a URL gravada começa pelo esquema, ex.: "example.com")
+        try:
+            filters["$or"] = [
+                {"slug": prefix_regex(q, ignore_case=False)},
+                {"title_lc": prefix_regex(q.lower(), ignore_case=False)},
+                {"original_url": contains_regex(q)},
+            ]
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    skip = (page - 1) * page_size
+
+    if sort == "created_desc":
+        page_coro = _links_page_by_created(filters, rr, skip, page_size)
+    else:
+        sort_field = "clicks" if sort == "clicks_desc" else "last_click"
+        page_coro = _links_page_by_metric(filters, rr, sort_field, skip, page_size)
+
+    # página (já ordenada no banco) e total em paralelo
+    total, docs = await asyncio.gather(
+        db.links.count_documents(filters, maxTimeMS=DASH_MAX_TIME_MS),
+        page_coro,
     )
 
+    items: List[Dict[str, Any]] = []
+    for d in docs:
+        items.append({
+            "id": str(d["_id"]),
+            "slug": d["slug"],
+            "original_url": d["original_url"],
+            "title": d.get("title"),
+            "notes": d.get("notes"),
+            "tags": d.get("tags", []) or [],
+            "is_active": bool(d.get("is_active", True)),
+            "created_at": d["created_at"],
+            "expires_at": d.get("expires_at"),
+            "max_clicks": d.get("max_clicks"),
+            "clicks": int(d.get("clicks", 0) or 0),
+            "unique_ips": int(d.get("unique_ips", 0) or 0),
+            "last_click": d.get("last_click"),
+        })
+
+    return {
+        "range": _range_out(rr),
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "data": items,
+    }
+
 
 @router.get("/links/{slug}/stats", response_model=LinkStatsResponse, dependencies=[Depends(admin_required)])
 async def link_stats(
@@ -331,7 +467,19 @@ async def link_stats(
 ):
     rr = resolve_range(from_, to, tz_name=tz, default_days=7)
 
-    link_doc = await db.links.find_one({"slug": slug})
+    link_doc = await db.links.find_one(
+        {"slug": slug},
+        projection={
+            "slug": 1,
+            "original_url": 1,
+            "title": 1,
+            "tags": 1,
+            "is_active": 1,
+            "created_at": 1,
+            "expires_at": 1,
+            "max_clicks": 1,
+        },
+    )
     link_snapshot = None
     if link_doc:
         link_snapshot = {
@@ -349,29 +497,10 @@ async def link_stats(
     fmt = "%Y-%m-%d" if group_by == "day" else "%Y-%m-%d %H:00"
 
     pipeline = [
-        {"$match": {"slug": slug}},
-        _ts_add_fields_stage(),
-        _ts_match_range_stage(rr.from_utc, rr.to_utc),
+        _ts_match_range_stage(rr.from_utc, rr.to_utc, slug=slug),
         {
             "$facet": {
-                "summary": [
-                    {
-                        "$group": {
-                            "_id": None,
-                            "clicks_total": {"$sum": 1},
-                            "ips": {"$addToSet": "$ip"},
-                            "last_click": {"$max": "$ts"},
-                        }
-                    },
-                    {
-                        "$project": {
-                            "_id": 0,
-                            "clicks_total": 1,
-                            "unique_ips": {"$size": "$ips"},
-                            "last_click": 1,
-                        }
-                    },
-                ],
+                "summary": _clicks_summary_stages(),
                 "series": [
                     {
                         "$group": {
@@ -442,7 +571,7 @@ async def link_stats(
         },
     ]
 
-    agg = await db.access_logs.aggregate(pipeline).to_list(length=1)
+    agg = await db.access_logs.aggregate(pipeline, maxTimeMS=DASH_MAX_TIME_MS).to_list(length=1)
     agg = agg[0] if agg else {}
 
     summary = (agg.get("summary") or [{}])[0]
@@ -469,7 +598,11 @@ async def link_stats(
     )
 
 
-@router.get("/access-logs", response_model=PaginatedAccessLogsResponse, dependencies=[Depends(admin_required)])
+@router.get(
+    "/access-logs",
+    responses={200: {"model": PaginatedAccessLogsResponse}},
+    dependencies=[Depends(admin_required)],
+)
 async def access_logs(
     slug: Optional[str] = Query(None),
     from_: Optional[str] = Query(None, alias="from"),
@@ -483,72 +616,41 @@ async def access_logs(
     match_slug = {"slug": slug} if slug else {}
 
     pipeline_total = [
-        {"$match": match_slug} if match_slug else {"$match": {}},
-        _ts_add_fields_stage(),
-        _ts_match_range_stage(rr.from_utc, rr.to_utc),
+        _ts_match_range_stage(rr.from_utc, rr.to_utc, **match_slug),
         {"$count": "total"},
     ]
-    total_doc = await db.access_logs.aggregate(pipeline_total).to_list(length=1)
+    total_doc = await db.access_logs.aggregate(pipeline_total, maxTimeMS=DASH_MAX_TIME_MS).to_list(length=1)
     total = int(total_doc[0]["total"]) if total_doc else 0
 
     skip = (page - 1) * page_size
 
     pipeline_page = [
-        {"$match": match_slug} if match_slug else {"$match": {}},
-        _ts_add_fields_stage(),
-        _ts_match_range_stage(rr.from_utc, rr.to_utc),
+        _ts_match_range_stage(rr.from_utc, rr.to_utc, **match_slug),
         {"$sort": {"ts": -1}},
         {"$skip": skip},
         {"$limit": page_size},
+        # formato final de AccessLogItem montado no servidor
         {
             "$project": {
-                "_id": 1,
+                "_id": 0,
+                "id": {"$toString": "$_id"},
                 "slug": 1,
-                "ts": 1,
-                "ip": 1,
-                "user_agent": 1,
-                "referer": 1,
-                "browser": 1,
-                "os": 1,
-                "device": 1,
-                "is_mobile": 1,
-                "is_tablet": 1,
-                "is_pc": 1,
-                "country": 1,
-                "region": 1,
-                "city": 1,
+                "timestamp": "$ts",
+                **{f: {"$ifNull": [f"${f}", None]} for f in ACCESS_LOG_ITEM_FIELDS},
             }
         },
     ]
 
-    docs = await db.access_logs.aggregate(pipeline_page).to_list(length=page_size)
+    docs = await db.access_logs.aggregate(
+        pipeline_page,
+        batchSize=page_size,
+        maxTimeMS=DASH_MAX_TIME_MS,
+    ).to_list(length=page_size)
 
-    items: List[AccessLogItem] = []
-    for d in docs:
-        items.append(
-            AccessLogItem(
-                id=str(d["_id"]),
-                slug=d["slug"],
-                timestamp=d["ts"],
-                ip=d.get("ip"),
-                user_agent=d.get("user_agent"),
-                referer=d.get("referer"),
-                browser=d.get("browser"),
-                os=d.get("os"),
-                device=d.get("device"),
-                is_mobile=d.get("is_mobile"),
-                is_tablet=d.get("is_tablet"),
-                is_pc=d.get("is_pc"),
-                country=d.get("country"),
-                region=d.get("region"),
-                city=d.get("city"),
-            )
-        )
-
-    return PaginatedAccessLogsResponse(
-        range=_range_out(rr),
-        page=page,
-        page_size=page_size,
-        total=total,
-        data=items,
-    )
+    return {
+        "range": _range_out(rr),
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "data": docs,
+    }
@@ -1,25 +1,27 @@
 import structlog
-import httpx
 
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import Any, Dict
 from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
 
-from fastapi import APIRouter, HTTPException, Request
+from bson import ObjectId
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
 from fastapi.responses import RedirectResponse, HTMLResponse
-from fastapi.templating import Jinja2Templates
 
+from core.access_logs import access_log_writer
 from core.db import db
+from core.http import http_client
+from core.templates import page_response
 from schemas.shortlink import AccessLogResponse
 from utils.device import parse_user_agent, get_geo_from_ip
 
 router = APIRouter()
 log = structlog.get_logger()
-templates = Jinja2Templates(directory="src/static/templates")
 
 
 @router.get("/", response_class=HTMLResponse)
-async def index(request: Request):
-    return templates.TemplateResponse("login.html", {"request": request})
+async def index():
+    return page_response("login.html")
 
 
 @router.get("/alive")
@@ -27,14 +29,30 @@ async def alive():
     return {"status": "ok", "env": "prod"}
 
 
+async def _send_callback(url: str, payload: Dict[str, Any]) -> None:
+    try:
+        await http_client.post(
+            url,
+            json=payload,
+            timeout=3.0,
+            headers={"Content-Type": "application/json"},
+        )
+        log.info("Callback enviado com sucesso", url=url)
+    except Exception as e:
+        log.warning("Callback failed", error=str(e))
+
+
 @router.get("/{slug}", response_model=AccessLogResponse)
-async def redirect(slug: str, request: Request):
+async def redirect(slug: str, request: Request, background_tasks: BackgroundTasks):
     """
     Redireciona um slug para a URL original, registrando acesso
     e executando callback (se houver). Agora repassa também a query
     da requisição (?i=..., etc.) para a URL final.
     """
-    link = await db.links.find_one({"slug": slug})
+    link = await db.links.find_one(
+        {"slug": slug},
+        projection={"original_url": 1, "callback_url": 1},
+    )
     if not link:
         raise HTTPException(status_code=404, detail="Link not found")
 
@@ -64,9 +82,10 @@ async def redirect(slug: str, request: Request):
     device_info.pop("ip", None)
     geo_info.pop("ip", None)
 
+    now = datetime.now(timezone.utc)
     access_log = {
         "slug": slug,
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": now.isoformat(),
         "ip": ip,
         "user_agent": ua,
         "referer": referer,
@@ -79,8 +98,12 @@ async def redirect(slug: str, request: Request):
         **geo_info,
     }
 
-    result = await db.access_logs.insert_one(access_log)
-    access_log["_id"] = str(result.inserted_id)
+    # ts nativo (BSON date) para filtros/ordenação indexados; timestamp
+    # continua como string ISO no payload do callback. O _id é gerado aqui
+    # e a gravação vai em lote (insert_many) fora do caminho do redirect.
+    log_id = ObjectId()
+    access_log_writer.put({**access_log, "_id": log_id, "ts": now})
+    access_log["_id"] = str(log_id)
 
     log.info(
         "Link accessed",
@@ -91,17 +114,8 @@ async def redirect(slug: str, request: Request):
         **geo_info,
     )
 
+    # callback é fire-and-forget: sai depois do 302, sem somar até 3s ao redirect
     if link.get("callback_url"):
-        try:
-            async with httpx.AsyncClient() as client:
-                await client.post(
-                    link["callback_url"],
-                    json=access_log,
-                    timeout=3.0,
-                    headers={"Content-Type": "application/json"},
-                )
-            log.info("Callback enviado com sucesso", url=link["callback_url"])
-        except Exception as e:
-            log.warning("Callback failed", error=str(e))
+        background_tasks.add_task(_send_callback, link["callback_url"], access_log)
 
     return RedirectResponse(final_url)
\ No newline at end of file
@@ -0,0 +1,49 @@
+import argparse
+import asyncio
+import logging
+
+from core.db import db
+
+
+log = logging.getLogger("access_logs_backfill_ts")
+
+# logs antigos só têm "timestamp" (string ISO); o dashboard filtra por "ts"
+BACKFILL_FILTER = {"ts": {"$exists": False}, "timestamp": {"$type": "string"}}
+BACKFILL_UPDATE = [
+    {
+        "$set": {
+            "ts": {
+                "$dateFromString": {
+                    "dateString": "$timestamp",
+                    "onError": None,
+                    "onNull": None,
+                }
+            }
+        }
+    }
+]
+
+
+async def run(dry_run: bool):
+    pending = await db.access_logs.count_documents(BACKFILL_FILTER)
+
+    if dry_run:
+        log.info("[dry-run] would backfill ts on %d access logs", pending)
+        return
+
+    res = await db.access_logs.update_many(BACKFILL_FILTER, BACKFILL_UPDATE)
+    log.info("done. pending=%d matched=%d modified=%d", pending, res.matched_count, res.modified_count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill access_logs.ts (BSON date) from the legacy timestamp string.")
+    parser.add_argument("--dry-run", action="store_true", help="Only count documents that would be updated")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s - %(message)s")
+
+    asyncio.run(run(dry_run=args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
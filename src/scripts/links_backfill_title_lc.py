@@ -0,0 +1,52 @@
+import argparse
+import asyncio
+import logging
+
+from pymongo import UpdateOne
+
+from core.db import db
+
+
+log = logging.getLogger("links_backfill_title_lc")
+
+BATCH_SIZE = 500
+
+# str.lower() no Python (e não $toLower no Mongo, que só é definido para
+# ASCII) para bater com o que o admin grava em títulos acentuados
+BACKFILL_FILTER = {"title_lc": {"$exists": False}, "title": {"$type": "string"}}
+
+
+async def run(dry_run: bool):
+    cursor = db.links.find(BACKFILL_FILTER, projection={"title": 1}).batch_size(BATCH_SIZE)
+
+    scanned = 0
+    modified = 0
+
+    while True:
+        docs = await cursor.to_list(length=BATCH_SIZE)
+        if not docs:
+            break
+        scanned += len(docs)
+
+        if dry_run:
+            continue
+
+        ops = [UpdateOne({"_id": d["_id"]}, {"$set": {"title_lc": d["title"].lower()}}) for d in docs]
+        res = await db.links.bulk_write(ops, ordered=False)
+        modified += res.modified_count
+
+    log.info("done. scanned=%d modified=%d dry_run=%s", scanned, modified, dry_run)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill links.title_lc (lowercase title used by the title filter).")
+    parser.add_argument("--dry-run", action="store_true", help="Only count documents that would be updated")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s - %(message)s")
+
+    asyncio.run(run(dry_run=args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from core.config import settings
+from core.db import db
+from utils.qr import generate_qr
+
+
+log = logging.getLogger("links_dedupe_slugs")
+
+BASE_URL = settings.BASE_URL.rstrip("/")
+
+# mesmos slugs que o índice único parcial cobre (ensure_slug_index)
+DUPLICATES_PIPELINE: List[Dict[str, Any]] = [
+    {"$match": {"slug": {"$gt": ""}}},
+    {"$sort": {"created_at": 1, "_id": 1}},
+    {"$group": {"_id": "$slug", "ids": {"$push": "$_id"}, "n": {"$sum": 1}}},
+    {"$match": {"n": {"$gt": 1}}},
+]
+
+
+async def _free_slug(slug: str) -> str:
+    """Primeiro "{slug}-{n}" ainda sem link (o índice único ainda não existe)."""
+    n = 2
+    while await db.links.find_one({"slug": f"{slug}-{n}"}, projection={"_id": 1}):
+        n += 1
+    return f"{slug}-{n}"
+
+
+async def run(dry_run: bool):
+    groups = await db.links.aggregate(DUPLICATES_PIPELINE, allowDiskUse=True).to_list(length=None)
+
+    renamed = 0
+    for group in groups:
+        slug = group["_id"]
+        # o link mais antigo fica com o slug (e com os access_logs, que são
+        # gravados só por slug e não dá para separar entre os duplicados)
+        keep, *others = group["ids"]
+
+        for oid in others:
+            new_slug = await _free_slug(slug)
+
+            if dry_run:
+                log.info("[dry-run] would rename %s: %s -> %s (keeping %s)", oid, slug, new_slug, keep)
+                continue
+
+            qr_png_rel, qr_svg_rel = await asyncio.to_thread(generate_qr, new_slug)
+            await db.links.update_one(
+                {"_id": oid},
+                {"$set": {
+                    "slug": new_slug,
+                    "qr_png": f"{BASE_URL}/{qr_png_rel.lstrip('/')}",
+                    "qr_svg": f"{BASE_URL}/{qr_svg_rel.lstrip('/')}",
+                    "updated_at": datetime.now(timezone.utc),
+                }},
+            )
+            renamed += 1
+            log.info("renamed %s: %s -> %s (keeping %s)", oid, slug, new_slug, keep)
+
+    log.info("done. duplicated_slugs=%d renamed=%d dry_run=%s", len(groups), renamed, dry_run)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rename links with duplicated slugs so the unique slug index can be built."
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Only log the renames that would be made")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s - %(message)s")
+
+    asyncio.run(run(dry_run=args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ from user_agents import parse
 import ipaddress
 import logging
 
-import httpx
+from core.http import http_client
 
 
 logger = logging.getLogger(__name__)
@@ -43,10 +43,9 @@ async def get_geo_from_ip(ip: Optional[str]) -> Dict[str, Any]:
 
     url = f"https://ipapi.co/{ip}/json/"
     try:
-        async with httpx.AsyncClient(timeout=2.0) as client:
-            resp = await client.get(url)
-            resp.raise_for_status()
-            data = resp.json()
+        resp = await http_client.get(url, timeout=2.0)
+        resp.raise_for_status()
+        data = resp.json()
     except Exception as exc:
         logger.warning("Falha ao buscar geo para IP %s: %s", ip, exc)
         return {"ip": ip}
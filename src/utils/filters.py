@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+
+from bson.regex import Regex
+
+
+MAX_FILTER_LEN = 128
+
+
+def _term(value: str) -> str:
+    """
+    Escapa o termo de busca para o regex do Mongo: o usuário nunca
+    injeta metacaracteres (ex.: "(.+)+" com backtracking catastrófico).
+    ValueError se passar de MAX_FILTER_LEN (as rotas devolvem 400).
+    """
+    if len(value) > MAX_FILTER_LEN:
+        raise ValueError(f"Filtro excede {MAX_FILTER_LEN} caracteres")
+    return re.escape(value)
+
+
+@lru_cache(maxsize=512)
+def prefix_regex(value: str, ignore_case: bool = True) -> Regex:
+    """
+    Regex ancorada no início (^) com o termo escapado, para que o Mongo
+    consiga usar o índice do campo em vez de um COLLSCAN.
+    Sem ignore_case os limites do IXSCAN ficam restritos ao prefixo.
+    Cacheada: o painel repete o mesmo termo a cada página/tecla.
+    """
+    return Regex(f"^{_term(value)}", "i" if ignore_case else "")
+
+
+@lru_cache(maxsize=512)
+def contains_regex(value: str) -> Regex:
+    """Busca por substring (case-insensitive) com o termo escapado."""
+    return Regex(_term(value), "i")
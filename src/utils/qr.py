@@ -1,12 +1,31 @@
-import segno
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Optional
+
+import segno
 
 from core.config import settings
 
-def generate_qr(slug: str):
-    url = f"{settings.BASE_URL}/{slug}"
+STATIC_PATH = Path("src/static/qrs")
+LINK_URL = settings.BASE_URL + "/{slug}"
+
+QR_POOL_WORKERS = min(4, os.cpu_count() or 1)
+
+_qr_pool: Optional[ProcessPoolExecutor] = None
 
-    STATIC_PATH = Path("src/static/qrs")
+
+def generate_qr(slug: str):
+    """
+    Gera PNG e SVG do QR do slug. É síncrono (CPU + disco) e tem dois
+    chamadores: o shorten_link, via asyncio.to_thread (um QR por vez), e o
+    _regenerate do admin, que manda os lotes para o pool "spawn" de
+    get_qr_pool. Por isso precisa continuar uma função de nível de módulo,
+    picklável e que só depende do slug (o processo filho reimporta este
+    módulo e grava relativo ao mesmo cwd).
+    """
+    url = LINK_URL.format(slug=slug)
 
     png_path = STATIC_PATH / f"{slug}.png"
     svg_path = STATIC_PATH / f"{slug}.svg"
@@ -16,3 +35,25 @@ def generate_qr(slug: str):
     qr.save(svg_path, kind='svg', scale=60)
 
     return str(png_path), str(svg_path)
+
+
+def get_qr_pool() -> ProcessPoolExecutor:
+    """
+    Pool de processos para geração de QR em lote (o encode segura o GIL,
+    então threads não paralelizam). Criado sob demanda com "spawn" para
+    não herdar as threads do Motor num fork.
+    """
+    global _qr_pool
+    if _qr_pool is None:
+        _qr_pool = ProcessPoolExecutor(
+            max_workers=QR_POOL_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _qr_pool
+
+
+def shutdown_qr_pool() -> None:
+    global _qr_pool
+    if _qr_pool is not None:
+        _qr_pool.shutdown(wait=False, cancel_futures=True)
+        _qr_pool = None
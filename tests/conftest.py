@@ -0,0 +1,12 @@
+import os
+import sys
+from pathlib import Path
+
+# módulos da app são importados como no container (PYTHONPATH=src)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+# core.config exige essas variáveis; o client Mongo só conecta na primeira operação
+os.environ.setdefault("BASE_URL", "http://test")
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("JWT_SECRET", "test-secret-" + "x" * 64)
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
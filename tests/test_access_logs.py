@@ -0,0 +1,184 @@
+import asyncio
+
+import pytest
+from bson.errors import InvalidDocument
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from core import access_logs
+from core.access_logs import AccessLogWriter
+
+
+class FakeCollection:
+    """insert_many/insert_one em memória, com falhas programadas."""
+
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.batches = []
+        self.docs = []
+
+    async def insert_many(self, docs, ordered=True):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.batches.append(list(docs))
+        self.docs.extend(docs)
+
+    async def insert_one(self, doc):
+        if doc.get("bad"):
+            raise InvalidDocument("documento inválido")
+        self.docs.append(doc)
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    real_sleep = asyncio.sleep
+
+    async def fast_sleep(delay, *args, **kwargs):
+        await real_sleep(0)
+
+    monkeypatch.setattr(access_logs.asyncio, "sleep", fast_sleep)
+
+
+@pytest.mark.asyncio
+async def test_writes_in_batches_of_max_batch():
+    collection = FakeCollection()
+    writer = AccessLogWriter(collection, max_batch=3, max_delay=0.5)
+    writer.start()
+    for i in range(7):
+        writer.put({"n": i})
+    await writer.stop()
+
+    assert [len(b) for b in collection.batches] == [3, 3, 1]
+    assert [d["n"] for d in collection.docs] == list(range(7))
+
+
+@pytest.mark.asyncio
+async def test_partial_batch_is_written_after_max_delay():
+    collection = FakeCollection()
+    writer = AccessLogWriter(collection, max_batch=100, max_delay=0.01)
+    writer.start()
+    writer.put({"n": 1})
+    await asyncio.sleep(0.1)
+
+    assert collection.docs == [{"n": 1}]
+    await writer.stop()
+
+
+@pytest.mark.asyncio
+async def test_flush_waits_for_queued_docs():
+    collection = FakeCollection()
+    writer = AccessLogWriter(collection, max_batch=100, max_delay=0.01)
+    writer.start()
+    writer.put({"n": 1})
+    assert await writer.flush(timeout=1.0)
+    assert collection.docs == [{"n": 1}]
+    await writer.stop()
+
+
+@pytest.mark.asyncio
+async def test_flush_ignores_docs_put_after_it():
+    class SlowCollection(FakeCollection):
+        async def insert_many(self, docs, ordered=True):
+            await asyncio.sleep(0.001)
+            await super().insert_many(docs, ordered)
+
+    collection = SlowCollection()
+    writer = AccessLogWriter(collection, max_batch=1, max_delay=0.01)
+    writer.put({"n": 1})
+    flush = asyncio.create_task(writer.flush(timeout=1.0))
+    await asyncio.sleep(0)
+    for i in range(2, 50):
+        writer.put({"n": i})
+    writer.start()
+
+    assert await flush
+    # o consumidor grava um por vez: o flush voltou antes do fim da fila
+    assert collection.docs[0] == {"n": 1}
+    assert writer._queue.qsize() > 0
+    await writer.stop()
+
+
+@pytest.mark.asyncio
+async def test_flush_times_out_without_consumer():
+    writer = AccessLogWriter(FakeCollection())
+    assert await writer.flush(timeout=1.0)
+    writer.put({"n": 1})
+    assert await writer.flush(timeout=0.01) is False
+    assert writer._waiters == []
+
+
+@pytest.mark.asyncio
+async def test_drops_when_queue_is_full():
+    writer = AccessLogWriter(FakeCollection(), maxsize=2)
+    for i in range(5):
+        writer.put({"n": i})
+    assert writer.dropped == 3
+
+
+@pytest.mark.asyncio
+async def test_retries_transient_errors(no_backoff):
+    collection = FakeCollection(failures=[AutoReconnect("caiu"), AutoReconnect("caiu")])
+    writer = AccessLogWriter(collection, max_retries=3)
+    await writer._write([{"n": 1}])
+    assert collection.docs == [{"n": 1}]
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_retries(no_backoff):
+    collection = FakeCollection(failures=[AutoReconnect("caiu")] * 3)
+    writer = AccessLogWriter(collection, max_retries=3)
+    await writer._write([{"n": 1}])
+    assert collection.docs == []
+    assert collection.failures == []
+
+
+@pytest.mark.asyncio
+async def test_invalid_document_only_loses_the_bad_doc():
+    collection = FakeCollection(failures=[InvalidDocument("raw inválido")])
+    writer = AccessLogWriter(collection)
+    await writer._write([{"n": 1}, {"n": 2, "bad": True}, {"n": 3}])
+    assert [d["n"] for d in collection.docs] == [1, 3]
+
+
+@pytest.mark.asyncio
+async def test_bulk_write_error_is_not_retried():
+    error = BulkWriteError({"writeErrors": [{"index": 0, "code": 11000}]})
+    collection = FakeCollection(failures=[error])
+    writer = AccessLogWriter(collection)
+    await writer._write([{"n": 1}])
+    assert collection.batches == []
+
+
+@pytest.mark.asyncio
+async def test_consumer_survives_unexpected_errors(no_backoff):
+    collection = FakeCollection(failures=[RuntimeError("bug")] * 3)
+    writer = AccessLogWriter(collection, max_batch=1, max_delay=0.01, max_retries=3)
+    writer.start()
+    writer.put({"n": 1})
+    writer.put({"n": 2})
+    await writer.stop()
+    assert collection.docs == [{"n": 2}]
+
+
+@pytest.mark.asyncio
+async def test_consumer_is_restarted_if_it_dies(monkeypatch):
+    collection = FakeCollection()
+    writer = AccessLogWriter(collection, max_delay=0.01)
+    real_next_batch = writer._next_batch
+    calls = 0
+
+    async def flaky_next_batch():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("bug")
+        return await real_next_batch()
+
+    monkeypatch.setattr(writer, "_next_batch", flaky_next_batch)
+    writer.start()
+    first = writer._task
+    await asyncio.sleep(0.01)
+
+    assert writer._task is not None and writer._task is not first
+    writer.put({"n": 1})
+    await writer.stop()
+    assert collection.docs == [{"n": 1}]
@@ -0,0 +1,476 @@
+import asyncio
+import csv
+import inspect
+import io
+import random
+import re
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+from fastapi import BackgroundTasks, HTTPException
+from pymongo.errors import DuplicateKeyError
+
+from core.access_logs import AccessLogWriter
+from core.versions import links_version
+from routes import admin
+from utils.filters import MAX_FILTER_LEN
+
+
+def _matches(rx, value: str) -> bool:
+    return re.compile(rx.pattern, rx.flags).search(value) is not None
+
+
+def test_link_filters_empty():
+    assert admin._link_filters() == {}
+
+
+def test_link_filters_slug_and_title_are_prefixes():
+    filters = admin._link_filters(slug="abc", title="Promo")
+    assert _matches(filters["slug"], "abc123")
+    assert not _matches(filters["slug"], "xabc")
+    assert not _matches(filters["slug"], "ABC")
+    # título vai para title_lc, já em minúsculas
+    assert "title" not in filters
+    assert _matches(filters["title_lc"], "promo de natal")
+    assert not _matches(filters["title_lc"], "super promo")
+
+
+def test_link_filters_urls_match_substring():
+    filters = admin._link_filters(original_url="Example.com", callback_url="hooks.example")
+    assert _matches(filters["original_url"], "https://example.com/landing")
+    assert _matches(filters["callback_url"], "https://hooks.example.org/cb")
+    assert not _matches(filters["original_url"], "https://other.org")
+
+
+def test_link_filters_notes_tag_and_active():
+    filters = admin._link_filters(notes="black friday", tag="promo", is_active=False)
+    assert _matches(filters["notes"], "Campanha Black Friday 2025")
+    assert filters["tags"] == "promo"
+    assert filters["is_active"] is False
+
+
+def test_link_filters_date_range_is_inclusive_utc():
+    filters = admin._link_filters(date_from=date(2025, 1, 1), date_to=date(2025, 1, 31))
+    created = filters["created_at"]
+    assert created["$gte"] == datetime(2025, 1, 1, tzinfo=timezone.utc)
+    assert created["$lte"].date() == date(2025, 1, 31)
+    assert created["$lte"].tzinfo == timezone.utc
+    assert created["$lte"].hour == 23
+
+
+def test_link_filters_rejects_long_term():
+    with pytest.raises(HTTPException) as exc:
+        admin._link_filters(original_url="x" * 1000)
+    assert exc.value.status_code == 400
+    assert exc.value.detail == f"Filtro excede {MAX_FILTER_LEN} caracteres"
+
+
+def test_oid_valid():
+    oid = ObjectId()
+    assert admin._oid(str(oid)) == oid
+
+
+@pytest.mark.parametrize("value", ["", "123", "z" * 24, "0" * 23, "0" * 25, "0" * 24 + "\n"])
+def test_oid_invalid(value):
+    with pytest.raises(HTTPException) as exc:
+        admin._oid(value)
+    assert exc.value.status_code == 400
+    assert exc.value.detail == "ID inválido"
+
+
+def test_links_changed_invalidates_caches():
+    admin._count_cache["x"] = 10
+    before = links_version()
+    admin._links_changed()
+    assert len(admin._count_cache) == 0
+    assert links_version() == before + 1
+
+
+def _csv_writer_line(doc):
+    """Linha como o export gerava antes, via csv.writer."""
+    row = [
+        str(doc["_id"]),
+        doc.get("slug"),
+        doc.get("original_url"),
+        doc.get("title"),
+        doc.get("notes"),
+        "|".join(doc.get("tags") or []),
+        doc.get("is_active"),
+        doc.get("created_at").isoformat() if doc.get("created_at") else "",
+        doc.get("updated_at").isoformat() if doc.get("updated_at") else "",
+        doc.get("expires_at").isoformat() if doc.get("expires_at") else "",
+        doc.get("max_clicks") if doc.get("max_clicks") is not None else "",
+        doc.get("click_count", 0),
+        doc.get("callback_url") or "",
+    ]
+    buf = io.StringIO()
+    csv.writer(buf).writerow(row)
+    return buf.getvalue()
+
+
+NOW = datetime(2025, 3, 1, 12, 30, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize(
+    "doc",
+    [
+        {"_id": ObjectId()},
+        {
+            "_id": ObjectId(),
+            "slug": "abc123",
+            "original_url": "https://example.com/?a=1,b=2",
+            "title": 'Promo "Natal"',
+            "notes": "linha 1\nlinha 2\r\nfim",
+            "tags": ["promo", "a,b"],
+            "is_active": True,
+            "created_at": NOW,
+            "updated_at": NOW,
+            "expires_at": NOW,
+            "max_clicks": 0,
+            "click_count": 42,
+            "callback_url": "https://hooks.example.com/cb",
+        },
+        {"_id": ObjectId(), "slug": "", "title": "", "is_active": False, "tags": []},
+        {"_id": ObjectId(), "title": " espaços ", "notes": "'aspas simples'", "max_clicks": None},
+        {"_id": ObjectId(), "title": "ção ✓ \t tab", "callback_url": ""},
+    ],
+)
+def test_export_line_matches_csv_writer(doc):
+    assert admin._export_line(doc) == _csv_writer_line(doc)
+
+
+def test_export_line_matches_csv_writer_fuzz():
+    rnd = random.Random(1234)
+    alphabet = 'ab ,"\r\n\t;|ção'
+
+    def text():
+        if rnd.random() < 0.2:
+            return None
+        return "".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 12)))
+
+    for _ in range(500):
+        doc = {
+            "_id": ObjectId(),
+            "slug": text(),
+            "original_url": text(),
+            "title": text(),
+            "notes": text(),
+            "tags": [t for t in (text(), text()) if t is not None],
+            "is_active": rnd.choice([True, False, None]),
+            "created_at": rnd.choice([NOW, None]),
+            "max_clicks": rnd.choice([None, 0, 7]),
+            "click_count": rnd.randint(0, 1000),
+            "callback_url": text(),
+        }
+        assert admin._export_line(doc) == _csv_writer_line(doc)
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, *args):
+        return self
+
+    def skip(self, n):
+        self.docs = self.docs[n:]
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    async def to_list(self, length):
+        return self.docs[:length]
+
+
+class FakeLinks:
+    def __init__(self, docs=(), duplicates=()):
+        self.docs = list(docs)
+        self.duplicates = set(duplicates)
+        self.inserted = []
+
+    async def insert_one(self, doc):
+        if doc["slug"] in self.duplicates:
+            raise DuplicateKeyError("E11000 duplicate key")
+        doc["_id"] = ObjectId()
+        self.inserted.append(dict(doc))
+
+    async def delete_one(self, query):
+        self.inserted = [d for d in self.inserted if d["_id"] != query["_id"]]
+
+    def find(self, filters, projection=None):
+        self.projection = projection
+        return FakeCursor(list(self.docs))
+
+    async def estimated_document_count(self):
+        return len(self.docs)
+
+    async def count_documents(self, filters, limit=0):
+        return min(len(self.docs), limit) if limit else len(self.docs)
+
+
+@pytest.fixture
+def fake_links(monkeypatch):
+    def install(links):
+        monkeypatch.setattr(admin, "db", SimpleNamespace(links=links))
+        monkeypatch.setattr(admin, "generate_qr", lambda slug: None)
+        admin._count_cache.clear()
+        return links
+
+    return install
+
+
+async def _shorten(slug=None):
+    return await admin.shorten_link(
+        name="Promo",
+        url="https://example.com",
+        callback_url=None,
+        slug=slug,
+        notes=None,
+        expires_at=None,
+    )
+
+
+@pytest.mark.asyncio
+async def test_shorten_retries_generated_slug_on_collision(fake_links, monkeypatch):
+    links = fake_links(FakeLinks(duplicates={"aaaaaa"}))
+    generated = iter(["aaaaaaXX", "bbbbbbXX"])
+    monkeypatch.setattr(admin.shortuuid, "uuid", lambda: next(generated))
+
+    out = await _shorten()
+
+    assert out["slug"] == "bbbbbb"
+    assert [d["slug"] for d in links.inserted] == ["bbbbbb"]
+    assert links.inserted[0]["title_lc"] == "promo"
+
+
+@pytest.mark.asyncio
+async def test_shorten_custom_slug_conflict_is_409(fake_links):
+    fake_links(FakeLinks(duplicates={"promo"}))
+    with pytest.raises(HTTPException) as exc:
+        await _shorten(slug="promo")
+    assert exc.value.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_shorten_gives_up_after_slug_attempts(fake_links, monkeypatch):
+    fake_links(FakeLinks(duplicates={"aaaaaa"}))
+    monkeypatch.setattr(admin.shortuuid, "uuid", lambda: "aaaaaaXX")
+    with pytest.raises(HTTPException) as exc:
+        await _shorten()
+    assert exc.value.status_code == 409
+
+
+async def _list(page, page_size, **filters):
+    params = dict(
+        slug=None,
+        title=None,
+        original_url=None,
+        callback_url=None,
+        notes=None,
+        tag=None,
+        is_active=None,
+        date_from=None,
+        date_to=None,
+        include_qr=False,
+    )
+    params.update(filters)
+    return await admin.list_links(page=page, page_size=page_size, **params)
+
+
+def _link_docs(n):
+    now = datetime.now(timezone.utc)
+    return [{"_id": ObjectId(), "slug": f"s{i}", "created_at": now} for i in range(n)]
+
+
+@pytest.mark.asyncio
+async def test_list_links_has_more(fake_links):
+    fake_links(FakeLinks(docs=_link_docs(5)))
+
+    first = await _list(page=1, page_size=2)
+    last = await _list(page=3, page_size=2)
+
+    assert first["total"] == 5 and first["has_more"] is True
+    assert len(last["data"]) == 1 and last["has_more"] is False
+
+
+@pytest.mark.asyncio
+async def test_list_links_has_more_past_count_limit(fake_links, monkeypatch):
+    monkeypatch.setattr(admin, "COUNT_LIMIT", 4)
+    fake_links(FakeLinks(docs=_link_docs(10)))
+
+    out = await _list(page=2, page_size=2, tag="promo")
+
+    # total parou no limite, mas a página veio cheia: ainda pode haver mais
+    assert out["total"] == 4
+    assert out["has_more"] is True
+
+
+@pytest.mark.asyncio
+async def test_list_links_omits_qr_unless_requested(fake_links):
+    links = fake_links(FakeLinks(docs=_link_docs(1)))
+    default = inspect.signature(admin.list_links).parameters["include_qr"].default
+    assert default.default is False
+
+    await _list(page=1, page_size=10)
+    assert "qr_png" not in links.projection and "qr_svg" not in links.projection
+
+    await _list(page=1, page_size=10, include_qr=True)
+    assert links.projection["qr_png"] == 1 and links.projection["qr_svg"] == 1
+
+
+@pytest.mark.asyncio
+async def test_unfiltered_count_is_not_cached(fake_links):
+    links = fake_links(FakeLinks(docs=_link_docs(3)))
+    assert await admin._count_links({}) == 3
+
+    links.docs.extend(_link_docs(2))
+    assert await admin._count_links({}) == 5
+    assert len(admin._count_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_shorten_invalidates_filtered_count(fake_links):
+    links = fake_links(FakeLinks(docs=_link_docs(3)))
+    assert await admin._count_links({"tags": "promo"}) == 3
+
+    await _shorten(slug="novo")
+    links.docs.append(links.inserted[-1])
+    assert await admin._count_links({"tags": "promo"}) == 4
+
+
+class FakeAccessLogs:
+    """access_logs em memória: insert_many do writer e update_many do rename."""
+
+    def __init__(self, ops, insert_delay=0.0):
+        self.ops = ops
+        self.insert_delay = insert_delay
+        self.docs = []
+
+    async def insert_many(self, docs, ordered=True):
+        await asyncio.sleep(self.insert_delay)
+        self.docs.extend(docs)
+
+    async def update_many(self, filters, update):
+        self.ops.append(("rename", filters))
+        until = filters.get("ts", {}).get("$lte")
+        modified = 0
+        for doc in self.docs:
+            if doc["slug"] == filters["slug"] and (until is None or doc["ts"] <= until):
+                doc["slug"] = update["$set"]["slug"]
+                modified += 1
+        return SimpleNamespace(modified_count=modified)
+
+
+class FakeDeleteLinks:
+    def __init__(self, ops, doc):
+        self.ops = ops
+        self.doc = doc
+
+    async def find_one(self, filters, projection=None):
+        return self.doc if self.doc and self.doc["_id"] == filters["_id"] else None
+
+    async def find_one_and_delete(self, filters, projection=None):
+        self.ops.append(("delete", filters))
+        doc, self.doc = self.doc, None
+        return doc
+
+
+@pytest.fixture
+def delete_env(monkeypatch):
+    def install(insert_delay=0.0, **writer_options):
+        ops = []
+        link = {"_id": ObjectId(), "slug": "promo"}
+        access_logs = FakeAccessLogs(ops, insert_delay=insert_delay)
+        writer = AccessLogWriter(access_logs, **writer_options)
+        monkeypatch.setattr(admin, "db", SimpleNamespace(
+            links=FakeDeleteLinks(ops, link),
+            access_logs=access_logs,
+        ))
+        monkeypatch.setattr(admin, "access_log_writer", writer)
+        return SimpleNamespace(ops=ops, link=link, access_logs=access_logs, writer=writer)
+
+    return install
+
+
+def _access_log(slug="promo"):
+    return {"_id": ObjectId(), "slug": slug, "ts": datetime.now(timezone.utc)}
+
+
+@pytest.mark.asyncio
+async def test_delete_link_renames_logs_around_the_delete(delete_env):
+    env = delete_env(max_delay=0.01)
+    env.writer.start()
+    env.access_logs.docs.append(_access_log())
+    env.writer.put(_access_log())
+    tasks = BackgroundTasks()
+
+    await admin.delete_link(background_tasks=tasks, link_id=str(env.link["_id"]))
+    await env.writer.stop()
+
+    assert [op for op, _ in env.ops] == ["rename", "delete", "rename"]
+    before, after = env.ops[0][1], env.ops[2][1]
+    # antes do delete: todos os logs do slug (inclusive os legados sem ts)
+    assert before == {"slug": "promo"}
+    # depois: só até o delete, para não pegar logs de um slug reaproveitado
+    assert set(after["ts"]) == {"$lte"}
+    assert all(d["slug"].startswith("promo_deleted_") for d in env.access_logs.docs)
+    assert [t.func for t in tasks.tasks] == [admin._remove_qr_files]
+
+
+@pytest.mark.asyncio
+async def test_delete_link_is_prompt_under_redirect_traffic(delete_env):
+    env = delete_env(insert_delay=0.005, max_batch=10, max_delay=0.005)
+    env.writer.start()
+    stop = asyncio.Event()
+
+    async def redirects():
+        while not stop.is_set():
+            env.writer.put(_access_log())
+            await asyncio.sleep(0.001)
+
+    producer = asyncio.create_task(redirects())
+    await asyncio.sleep(0.05)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    tasks = BackgroundTasks()
+    try:
+        await admin.delete_link(background_tasks=tasks, link_id=str(env.link["_id"]))
+        elapsed = loop.time() - started
+    finally:
+        stop.set()
+        await producer
+        await env.writer.stop()
+
+    # a fila nunca esvazia, mas o flush só espera o que veio antes do delete
+    assert elapsed < admin.DELETE_FLUSH_TIMEOUT
+    assert [t.func for t in tasks.tasks] == [admin._remove_qr_files]
+
+
+@pytest.mark.asyncio
+async def test_delete_link_defers_rename_when_flush_times_out(delete_env, monkeypatch):
+    monkeypatch.setattr(admin, "DELETE_FLUSH_TIMEOUT", 0.01)
+    env = delete_env()
+    # consumidor parado: o que está no buffer não é gravado a tempo
+    env.writer.put(_access_log())
+    tasks = BackgroundTasks()
+
+    await admin.delete_link(background_tasks=tasks, link_id=str(env.link["_id"]))
+
+    assert [op for op, _ in env.ops] == ["rename", "delete"]
+    late, cleanup = tasks.tasks
+    assert late.func is admin._rename_late_access_logs
+    assert late.args[0] == "promo" and late.args[1].startswith("promo_deleted_")
+    assert cleanup.func is admin._remove_qr_files
+
+    env.writer.start()
+    await late()
+    await env.writer.stop()
+    assert [op for op, _ in env.ops] == ["rename", "delete", "rename"]
+    assert env.access_logs.docs[0]["slug"] == late.args[1]
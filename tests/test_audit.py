@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from core import audit
+from core.audit import LogQueue
+
+
+class FakeSender:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.sent = []
+
+    async def send(self, **record):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("LogCenter fora do ar")
+        self.sent.append(record)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    real_sleep = asyncio.sleep
+
+    async def fast_sleep(delay, *args, **kwargs):
+        await real_sleep(0)
+
+    monkeypatch.setattr(audit.asyncio, "sleep", fast_sleep)
+
+
+@pytest.mark.asyncio
+async def test_log_queue_sends_records():
+    sender = FakeSender()
+    queue = LogQueue(sender)
+    queue.start()
+    queue.put(level="INFO", message="a")
+    queue.put(level="INFO", message="b")
+    await queue.stop()
+    assert [r["message"] for r in sender.sent] == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_log_queue_retries_failed_send():
+    sender = FakeSender(failures=2)
+    queue = LogQueue(sender, max_retries=3)
+    queue.start()
+    queue.put(level="INFO", message="a")
+    await queue.stop()
+    assert [r["message"] for r in sender.sent] == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_log_queue_gives_up_and_keeps_draining():
+    sender = FakeSender(failures=3)
+    queue = LogQueue(sender, max_retries=3)
+    queue.start()
+    queue.put(level="INFO", message="perdido")
+    queue.put(level="INFO", message="b")
+    await queue.stop()
+    assert [r["message"] for r in sender.sent] == ["b"]
+
+
+def test_log_queue_drops_when_full():
+    queue = LogQueue(FakeSender(), maxsize=1)
+    queue.put(message="a")
+    queue.put(message="b")
+    assert queue.dropped == 1
@@ -0,0 +1,229 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from core.versions import bump_links_version
+from routes import dash
+from utils.filters import MAX_FILTER_LEN
+
+
+@pytest.fixture
+def overview_calls(monkeypatch):
+    calls = []
+
+    async def fake_body(from_, to, tz, top):
+        calls.append((from_, to, tz, top))
+        return b'{"n": %d}' % len(calls)
+
+    monkeypatch.setattr(dash, "_overview_body", fake_body)
+    dash._overview_cache.clear()
+    yield calls
+    dash._overview_cache.clear()
+
+
+async def _overview(**params):
+    args = dict(from_=None, to=None, tz="America/Sao_Paulo", top=10)
+    args.update(params)
+    return await dash.overview(**args)
+
+
+@pytest.mark.asyncio
+async def test_overview_reuses_cached_body(overview_calls):
+    first = await _overview()
+    second = await _overview()
+
+    assert first.body == second.body == b'{"n": 1}'
+    assert len(overview_calls) == 1
+    assert first.headers["cache-control"] == f"private, max-age={dash.OVERVIEW_CACHE_TTL}"
+
+
+@pytest.mark.asyncio
+async def test_overview_cache_is_keyed_by_params(overview_calls):
+    await _overview(top=10)
+    await _overview(top=5)
+    await _overview(from_="2025-01-01")
+
+    assert len(overview_calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_overview_cache_is_dropped_when_links_change(overview_calls):
+    await _overview()
+    bump_links_version()
+    second = await _overview()
+
+    assert len(overview_calls) == 2
+    assert second.body == b'{"n": 2}'
+
+
+T0 = datetime(2025, 1, 10, tzinfo=timezone.utc)
+RANGE = SimpleNamespace(from_utc=T0, to_utc=T0 + timedelta(days=1))
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return self.docs[:length]
+
+
+def _matches(doc, filters):
+    # igualdade simples basta para os filtros usados nos testes
+    return all(doc.get(k) == v for k, v in filters.items())
+
+
+def _in_range(log, match):
+    return match["ts"]["$gte"] <= log["ts"] <= match["ts"]["$lte"]
+
+
+class FakeAccessLogs:
+    """Só o pipeline de clicados do _links_page_by_metric."""
+
+    def __init__(self, logs, links):
+        self.logs = logs
+        self.links = links
+
+    def aggregate(self, pipeline, **kwargs):
+        match = pipeline[0]["$match"]
+        lookup = next(st["$lookup"] for st in pipeline if "$lookup" in st)
+        link_filters = lookup["pipeline"][0]["$match"]
+        sort = next(st["$sort"] for st in pipeline if "$sort" in st)
+        facet = pipeline[-1]["$facet"]["page"]
+
+        stats = {}
+        for log in self.logs:
+            if not _in_range(log, match):
+                continue
+            st = stats.setdefault(log["slug"], {"clicks": 0, "ips": set(), "last_click": log["ts"]})
+            st["clicks"] += 1
+            st["ips"].add(log["ip"])
+            st["last_click"] = max(st["last_click"], log["ts"])
+
+        rows = []
+        for slug, st in stats.items():
+            link = next((l for l in self.links if l["slug"] == slug and _matches(l, link_filters)), None)
+            if link:
+                rows.append({
+                    "_id": slug, "link": dict(link), "clicks": st["clicks"],
+                    "unique_ips": len(st["ips"]), "last_click": st["last_click"],
+                })
+        sort_field = next(iter(sort))
+        rows.sort(key=lambda r: r["_id"])
+        rows.sort(key=lambda r: (r[sort_field], r["link"]["created_at"]), reverse=True)
+        return FakeCursor([{
+            "page": rows[facet[0]["$skip"]:][:facet[1]["$limit"]],
+            "clicked": [{"n": len(rows)}] if rows else [],
+        }])
+
+
+class FakeDashLinks:
+    """Só o anti-join dos links sem clique do _links_page_by_metric."""
+
+    def __init__(self, links, logs):
+        self.links = links
+        self.logs = logs
+        self.pipelines = []
+
+    def aggregate(self, pipeline, **kwargs):
+        self.pipelines.append(pipeline)
+        stages = {next(iter(st)): st[next(iter(st))] for st in pipeline}
+        lookup = stages["$lookup"]
+        window = lookup["pipeline"][0]["$match"]
+
+        docs = [l for l in self.links if _matches(l, pipeline[0]["$match"])]
+        docs.sort(key=lambda l: l["created_at"], reverse=True)
+        docs = [
+            l for l in docs
+            if not any(g["slug"] == l["slug"] and _in_range(g, window) for g in self.logs)
+        ]
+        return FakeCursor(docs[stages["$skip"]:][:stages["$limit"]])
+
+
+@pytest.fixture
+def dash_db(monkeypatch):
+    links = [
+        {"slug": f"s{i}", "is_active": i != 4, "created_at": T0 - timedelta(days=i)}
+        for i in range(6)
+    ]
+    logs = [
+        {"slug": "s3", "ip": "1", "ts": T0 + timedelta(hours=1)},
+        {"slug": "s3", "ip": "2", "ts": T0 + timedelta(hours=2)},
+        {"slug": "s1", "ip": "1", "ts": T0 + timedelta(hours=3)},
+        # fora da janela: não conta como clique
+        {"slug": "s0", "ip": "1", "ts": T0 - timedelta(days=3)},
+    ]
+    db = SimpleNamespace(
+        links=FakeDashLinks(links, logs),
+        access_logs=FakeAccessLogs(logs, links),
+    )
+    monkeypatch.setattr(dash, "db", db)
+    return db
+
+
+async def _metric_page(page, page_size, filters=None, sort_field="clicks"):
+    return await dash._links_page_by_metric(
+        filters or {}, RANGE, sort_field, (page - 1) * page_size, page_size,
+    )
+
+
+@pytest.mark.asyncio
+async def test_links_page_by_metric_sorts_clicked_first(dash_db):
+    docs = await _metric_page(1, 2)
+
+    assert [d["slug"] for d in docs] == ["s3", "s1"]
+    assert docs[0]["clicks"] == 2 and docs[0]["unique_ips"] == 2
+    # página cheia de clicados não consulta a cauda
+    assert dash_db.links.pipelines == []
+
+
+@pytest.mark.asyncio
+async def test_links_page_by_metric_zero_click_tail(dash_db):
+    second = await _metric_page(2, 2)
+    third = await _metric_page(3, 2)
+
+    # sem clique na janela, por created_at desc (s0 só tem clique antigo)
+    assert [d["slug"] for d in second] == ["s0", "s2"]
+    assert [d["slug"] for d in third] == ["s4", "s5"]
+    assert "clicks" not in second[0]
+
+
+@pytest.mark.asyncio
+async def test_links_page_by_metric_mixed_page_and_filters(dash_db):
+    docs = await _metric_page(1, 4, filters={"is_active": True})
+    assert [d["slug"] for d in docs] == ["s3", "s1", "s0", "s2"]
+
+    tail = await _metric_page(2, 4, filters={"is_active": True})
+    assert [d["slug"] for d in tail] == ["s5"]
+
+
+@pytest.mark.asyncio
+async def test_links_page_by_metric_tail_is_a_bounded_anti_join(dash_db):
+    await _metric_page(2, 2)
+
+    (pipeline,) = dash_db.links.pipelines
+    lookup = next(st["$lookup"] for st in pipeline if "$lookup" in st)
+    assert lookup["from"] == "access_logs"
+    assert {"$limit": 1} in lookup["pipeline"]
+    assert {"$match": {"hit": {"$size": 0}}} in pipeline
+    assert {"$limit": 2} in pipeline
+
+
+@pytest.mark.asyncio
+async def test_list_links_rejects_long_search_term():
+    with pytest.raises(HTTPException) as exc:
+        await dash.list_links(
+            from_=None,
+            to=None,
+            tz="America/Sao_Paulo",
+            q="x" * (MAX_FILTER_LEN + 1),
+            tag=None,
+            is_active=None,
+            sort="clicks_desc",
+            page=1,
+            page_size=20,
+        )
+    assert exc.value.status_code == 400
+    assert exc.value.detail == f"Filtro excede {MAX_FILTER_LEN} caracteres"
@@ -0,0 +1,48 @@
+import re
+
+import pytest
+
+from utils.filters import MAX_FILTER_LEN, contains_regex, prefix_regex
+
+
+def test_prefix_regex_is_anchored_and_escaped():
+    rx = prefix_regex("a.b(c)", ignore_case=False)
+    assert rx.pattern == "^" + re.escape("a.b(c)")
+    assert rx.flags == 0
+
+    compiled = re.compile(rx.pattern)
+    assert compiled.match("a.b(c)-x")
+    assert not compiled.match("axb(c)")
+    assert not compiled.match("x-a.b(c)")
+
+
+def test_prefix_regex_ignore_case_by_default():
+    assert prefix_regex("Abc").flags & re.IGNORECASE
+
+
+def test_contains_regex_matches_substring_case_insensitive():
+    rx = contains_regex("Example.com")
+    assert rx.flags & re.IGNORECASE
+
+    compiled = re.compile(rx.pattern, re.IGNORECASE)
+    assert compiled.search("https://example.com/path")
+    assert not compiled.search("https://exampleXcom/path")
+
+
+def test_regex_never_injects_metacharacters():
+    rx = contains_regex("(.+)+$")
+    assert re.compile(rx.pattern).search("x(.+)+$y")
+    assert not re.compile(rx.pattern).search("abc")
+
+
+@pytest.mark.parametrize("builder", [prefix_regex, contains_regex])
+def test_filter_too_long(builder):
+    builder("x" * MAX_FILTER_LEN)
+    with pytest.raises(ValueError, match=f"Filtro excede {MAX_FILTER_LEN} caracteres"):
+        builder("x" * (MAX_FILTER_LEN + 1))
+
+
+def test_regex_builders_are_cached():
+    assert prefix_regex("abc") is prefix_regex("abc")
+    assert contains_regex("abc") is contains_regex("abc")
+    assert prefix_regex("abc") is not prefix_regex("abc", ignore_case=False)
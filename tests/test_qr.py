@@ -0,0 +1,167 @@
+import asyncio
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from core.versions import links_version
+from routes import admin
+from schemas.admin import RegenerateQrRequest
+from utils import qr
+
+
+class FakeFind:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self.docs:
+            yield doc
+
+    async def to_list(self, length=None):
+        return list(self.docs)
+
+
+class FakeRegenLinks:
+    def __init__(self, slugs):
+        self.docs = [{"_id": ObjectId(), "slug": s} for s in slugs]
+        self.ops = []
+
+    def find(self, filters, projection=None):
+        wanted = set(filters["slug"]["$in"])
+        return FakeFind([d for d in self.docs if d["slug"] in wanted])
+
+    async def bulk_write(self, ops, ordered=True):
+        self.ops.extend(ops)
+        return SimpleNamespace(modified_count=len(ops))
+
+
+@pytest.fixture
+def qr_dir(tmp_path, monkeypatch):
+    # STATIC_PATH é relativo ao cwd, que os processos "spawn" herdam
+    (tmp_path / "src" / "static" / "qrs").mkdir(parents=True)
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path / "src" / "static" / "qrs"
+    qr.shutdown_qr_pool()
+
+
+def test_generate_qr_is_picklable():
+    # o pool "spawn" envia a função por referência ao módulo
+    assert pickle.loads(pickle.dumps(qr.generate_qr)) is qr.generate_qr
+
+
+@pytest.mark.asyncio
+async def test_regenerate_runs_in_process_pool(qr_dir, monkeypatch):
+    links = FakeRegenLinks(["abc", "def", "a/b"])
+    monkeypatch.setattr(admin, "db", SimpleNamespace(links=links))
+
+    out = await admin.regenerate_qr_codes(
+        RegenerateQrRequest(slugs=["abc", "def", "abc", "a/b", "nao-existe"], force=True)
+    )
+
+    by_slug = {r["slug"]: r for r in out["results"]}
+    assert [r["slug"] for r in out["results"]] == ["abc", "def", "a/b", "nao-existe"]
+    assert by_slug["abc"]["ok"] and by_slug["def"]["ok"]
+    assert by_slug["abc"]["qr_png"].endswith("/abc.png")
+    # falha no worker vira resultado ok=False, sem derrubar o lote
+    assert by_slug["a/b"]["ok"] is False
+    assert by_slug["nao-existe"] == {
+        "slug": "nao-existe", "ok": False, "reason": "link_not_found", "qr_png": None, "qr_svg": None,
+    }
+    assert out["updated"] == 2
+    assert sorted(p.name for p in qr_dir.iterdir()) == ["abc.png", "abc.svg", "def.png", "def.svg"]
+
+
+@pytest.fixture
+def thread_pool(monkeypatch):
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(admin, "get_qr_pool", lambda: pool)
+    monkeypatch.setattr(admin, "generate_qr", lambda slug: (f"/qrs/{slug}.png", f"/qrs/{slug}.svg"))
+    yield pool
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_regenerate_job_runs_in_background(thread_pool, monkeypatch):
+    links = FakeRegenLinks(["abc", "def"])
+    monkeypatch.setattr(admin, "db", SimpleNamespace(links=links))
+
+    job = await admin.start_regenerate_job(RegenerateQrRequest(slugs=["abc", "def"]))
+    assert job["status"] == "pending" and job["requested"] == 2
+
+    await asyncio.gather(*admin._regen_tasks)
+
+    done = await admin.get_regenerate_job(job["task_id"])
+    assert done["status"] == "done"
+    assert done["result"]["updated"] == 2
+    assert not admin._regen_tasks
+
+
+@pytest.mark.asyncio
+async def test_regenerate_job_failure_is_reported(thread_pool, monkeypatch):
+    class BrokenLinks(FakeRegenLinks):
+        def find(self, filters, projection=None):
+            raise RuntimeError("mongo fora do ar")
+
+    monkeypatch.setattr(admin, "db", SimpleNamespace(links=BrokenLinks([])))
+
+    job = await admin.start_regenerate_job(RegenerateQrRequest(slug="abc"))
+    await asyncio.gather(*admin._regen_tasks)
+
+    failed = await admin.get_regenerate_job(job["task_id"])
+    assert failed["status"] == "failed"
+    assert failed["error"] == "mongo fora do ar"
+
+
+@pytest.mark.asyncio
+async def test_get_regenerate_job_unknown_is_404():
+    with pytest.raises(HTTPException) as exc:
+        await admin.get_regenerate_job("nao-existe")
+    assert exc.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_regenerate_invalidates_link_caches(thread_pool, monkeypatch):
+    class CountingLinks(FakeRegenLinks):
+        async def count_documents(self, filters, limit=0):
+            return sum(1 for d in self.docs if d.get("is_active") == filters["is_active"])
+
+        async def bulk_write(self, ops, ordered=True):
+            for op in ops:
+                doc = next(d for d in self.docs if d["_id"] == op._filter["_id"])
+                doc.update(op._doc["$set"])
+            return await super().bulk_write(ops, ordered)
+
+    links = CountingLinks(["abc", "def"])
+    for doc in links.docs:
+        doc["is_active"] = False
+    monkeypatch.setattr(admin, "db", SimpleNamespace(links=links))
+    admin._count_cache.clear()
+    before = links_version()
+    assert await admin._count_links({"is_active": False}) == 2
+
+    await admin.regenerate_qr_codes(RegenerateQrRequest(slug="abc"))
+
+    # regen reativa o link: o total em cache e o overview não valem mais
+    assert await admin._count_links({"is_active": False}) == 1
+    assert links_version() == before + 1
+    admin._count_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_regenerate_without_links_keeps_caches(thread_pool, monkeypatch):
+    monkeypatch.setattr(admin, "db", SimpleNamespace(links=FakeRegenLinks([])))
+    admin._count_cache["x"] = 10
+    before = links_version()
+
+    await admin.regenerate_qr_codes(RegenerateQrRequest(slug="abc"))
+
+    assert admin._count_cache["x"] == 10
+    assert links_version() == before
+    admin._count_cache.clear()
@@ -0,0 +1,114 @@
+import time
+
+import jwt
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from core import security
+from core.config import settings
+
+
+SECRET = settings.JWT_SECRET
+
+
+def _token(payload, key=SECRET, algorithm="HS256", headers=None):
+    return jwt.encode(payload, key, algorithm=algorithm, headers=headers)
+
+
+def _reference(token):
+    return jwt.decode(token, SECRET, algorithms=[settings.JWT_ALGORITHM])
+
+
+def _tamper(token):
+    header, payload, signature = token.split(".")
+    flipped = "A" if signature[0] != "A" else "B"
+    return ".".join([header, payload, flipped + signature[1:]])
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    security._jwt_cache.clear()
+    yield
+    security._jwt_cache.clear()
+
+
+def test_decode_jwt_valid_token_matches_pyjwt():
+    token = _token({"sub": "admin", "exp": int(time.time()) + 60})
+    assert security.decode_jwt(token) == _reference(token)
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        _tamper(_token({"sub": "admin"})),
+        _token({"sub": "admin", "exp": int(time.time()) - 10}),
+        _token({"sub": "admin", "nbf": int(time.time()) + 3600}),
+        _token({"sub": "admin", "iat": "ontem"}),
+        _token({"sub": "admin", "aud": "outro-servico"}),
+        _token({"sub": "admin"}, key="outra-chave-" + "y" * 64),
+        _token({"sub": "admin"}, algorithm="HS512"),
+        jwt.encode({"sub": "admin"}, None, algorithm="none"),
+        "nao.e.um.jwt",
+        "lixo",
+        "a.b.c",
+        "a..c",
+        "a.b.c.d",
+        "a.b.c\n",
+        "",
+    ],
+)
+def test_decode_jwt_rejects_what_pyjwt_rejects(token):
+    with pytest.raises(jwt.PyJWTError) as expected:
+        _reference(token)
+    with pytest.raises(jwt.PyJWTError) as got:
+        security.decode_jwt(token)
+    if security._JWT_SHAPE.match(token):
+        assert type(got.value) is type(expected.value)
+    else:
+        # formato inválido é barrado antes do PyJWT
+        assert isinstance(got.value, jwt.DecodeError)
+
+
+def test_decode_jwt_errors_are_not_cached():
+    token = _tamper(_token({"sub": "admin"}))
+    for _ in range(2):
+        with pytest.raises(jwt.PyJWTError):
+            security.decode_jwt(token)
+    assert len(security._jwt_cache) == 0
+
+
+def test_decode_jwt_caches_valid_payload():
+    token = _token({"sub": "admin", "exp": int(time.time()) + 60})
+    first = security.decode_jwt(token)
+    assert security.decode_jwt(token) is first
+
+
+def test_jwt_cache_entry_expires_with_token():
+    now = time.time()
+    assert security._jwt_ttu(b"k", {"exp": now + 5}, now) == now + 5
+    assert security._jwt_ttu(b"k", {}, now) == now + security.JWT_CACHE_TTL
+
+
+@pytest.mark.asyncio
+async def test_admin_required_without_credentials():
+    with pytest.raises(HTTPException) as exc:
+        await security.admin_required(None)
+    assert exc.value.status_code == 401
+    assert exc.value.detail == "Credenciais ausentes"
+
+
+@pytest.mark.asyncio
+async def test_admin_required_invalid_token():
+    creds = HTTPAuthorizationCredentials(scheme="Bearer", credentials="a.b.c")
+    with pytest.raises(HTTPException) as exc:
+        await security.admin_required(creds)
+    assert exc.value.status_code == 401
+    assert exc.value.detail == "Token inválido"
+
+
+@pytest.mark.asyncio
+async def test_admin_required_returns_payload():
+    token = _token({"sub": "admin"})
+    creds = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    assert await security.admin_required(creds) == {"sub": "admin"}